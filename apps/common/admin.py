@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from apps.common.models import Job
+
+
+# Register your models here.
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'name')
+    list_per_page = 20
+    search_fields = ('name',)
+    readonly_fields = ('claimed_by', 'claimed_at', 'started_at', 'finished_at', 'last_error')
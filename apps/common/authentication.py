@@ -0,0 +1,117 @@
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+# The user fields permission checks look at, answered without loading the user
+CLAIM_FIELDS = ('is_agent', 'email_verified')
+
+_claims_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+_claims_lock = threading.Lock()
+
+
+def get_user_claims(user_id) -> Optional[dict]:
+    """
+    Claims of a user from this process' cache, loaded with one narrow query on a miss.
+
+    Entries live for AUTH_USER_CACHE_TTL seconds, saving or deleting a user drops its entry in this
+    process right away, see apps.core.signals. Other processes catch up when their entry expires.
+    """
+    key = str(user_id)
+    with _claims_lock:
+        claims = _claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*CLAIM_FIELDS).first()
+    if claims is None:
+        return None
+    # The user model has no is_active column, every stored user is active and deleted ones are not found above
+    claims['is_active'] = True
+
+    with _claims_lock:
+        _claims_cache[key] = claims
+    return claims
+
+
+def invalidate_user_claims(user_id) -> None:
+    with _claims_lock:
+        _claims_cache.pop(str(user_id), None)
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    Authenticated user that answers id and the cached claims itself and loads the user row on first
+    access to anything else, so requests that only check permissions never query the user.
+
+    It reports the user model as its class, so isinstance checks and filtering by user work without
+    loading it. Assigning it to a foreign key loads it, and so does setting an attribute, after which the
+    loaded user's value is the one read back.
+    """
+
+    def __init__(self, user_id, claims: dict):
+        # Same type as the loaded user's pk, so comparisons with foreign key values hold
+        user_id = User._meta.pk.to_python(user_id)
+        super().__init__(lambda: User.objects.get(pk=user_id))
+        self.__dict__.update(claims, id=user_id, pk=user_id, _meta=User._meta,
+                             is_authenticated=True, is_anonymous=False)
+
+    @property
+    def __class__(self):
+        return User
+
+    def __bool__(self):
+        return True
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Set on the loaded user, a copied claim must no longer hide it
+        if name != '_wrapped':
+            self.__dict__.pop(name, None)
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        self.__dict__.pop(name, None)
+
+    def __getattr__(self, name):
+        # Probes like hasattr(user, 'resolve_expression') in the ORM must not load the user
+        if not name.startswith('_') and not hasattr(User, name):
+            raise AttributeError(name)
+        return super().__getattr__(name)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    SimpleJWT authentication that returns a LazyUser built from the per-process claims cache
+    instead of loading the user on every request.
+    """
+
+    def get_user(self, validated_token) -> LazyUser:
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        claims = get_user_claims(user_id)
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not claims['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return LazyUser(user_id, claims)
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    # Documents the Bearer scheme for the subclass as for SimpleJWT's own authentication
+    target_class = ClaimsJWTAuthentication
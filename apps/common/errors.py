@@ -21,3 +21,5 @@ class ErrorCode:
     INVALID_DATA_TYPE = "invalid_data_type"
     OTHER_ERROR = "other_error"
     INVALID_REFERRAL_CODE = "invalid_referral_code"
+    INVALID_OFFSET = "invalid_offset"
+    SERVER_BUSY = "server_busy"
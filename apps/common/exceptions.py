@@ -17,6 +17,14 @@ class RequestError(APIException):
         super().__init__()
 
 
+class PasswordHashPoolFull(Exception):
+    # Raised by the password hash pool when every thread is busy and its queue is full
+    default_detail = "Server is busy, please try again shortly"
+
+    def __init__(self, message: str = None):
+        super().__init__(message or self.default_detail)
+
+
 def handle_authentication_failed(exc):
     exc_list = str(exc).split("DETAIL: ")
     return CustomResponse.error(
@@ -35,6 +43,14 @@ def handle_request_error(exc):
     )
 
 
+def handle_password_hash_pool_full(exc):
+    return CustomResponse.error(
+        message=str(exc),
+        status_code=503,
+        err_code=ErrorCode.SERVER_BUSY,
+    )
+
+
 def handle_permission_error(exc):
     exc_list = str(exc).split("DETAIL: ")
 
@@ -72,6 +88,8 @@ def custom_exception_handler(exc, context):
             return handle_validation_error(exc)
         elif isinstance(exc, PermissionDenied):
             return handle_permission_error(exc)
+        elif isinstance(exc, PasswordHashPoolFull):
+            return handle_password_hash_pool_full(exc)
         else:
             status_code = 500 if not hasattr(exc, 'status_code') else exc.status_code
             return CustomResponse.error(
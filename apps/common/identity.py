@@ -0,0 +1,115 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from django.db import models
+from django.db.models import QuerySet
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+def _row_key(model, pk) -> tuple:
+    return model._meta.label, pk
+
+
+def _lookup_key(model, lookup: dict) -> tuple:
+    # Lookups are by exact field name, values are normalized so user=<User>, user=<pk> and "<pk>" agree
+    values = []
+    for name, value in sorted(lookup.items()):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        if field.is_relation:
+            value = value.pk if isinstance(value, models.Model) else value
+            field = field.target_field
+        values.append((field.name, field.to_python(value)))
+    return model._meta.label, tuple(values)
+
+
+class IdentityMap:
+    """
+    Rows loaded during one request, each kept once by model and primary key, so selectors asked for the
+    same row twice and serializers reading the same related rows again get the instances already loaded.
+
+    Saving or deleting an instance updates the map, see apps.common.signals. Rows changed with
+    QuerySet.update or in another process are not seen until the next request.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._lookups = {}
+        self._related = {}
+
+    def add(self, instance: models.Model) -> models.Model:
+        self._rows[_row_key(type(instance), instance.pk)] = instance
+        # Rows loaded along with it through select_related are known as well
+        for related in instance._state.fields_cache.values():
+            if isinstance(related, models.Model) and related.pk is not None:
+                self._rows.setdefault(_row_key(type(related), related.pk), related)
+        return instance
+
+    def changed(self, instance: models.Model, deleted: bool = False) -> None:
+        # Related lists holding rows of the model may have gained, lost or changed one
+        self._related = {key: entry for key, entry in self._related.items() if entry[0] != instance._meta.label}
+        if deleted:
+            self._rows.pop(_row_key(type(instance), instance.pk), None)
+        else:
+            self._rows[_row_key(type(instance), instance.pk)] = instance
+
+    def get(self, queryset: QuerySet, **lookup) -> models.Model:
+        model = queryset.model
+        key = _lookup_key(model, lookup)
+        values = key[1]
+        # By primary key the row may already be known from another lookup or a select_related
+        pk = values[0][1] if len(values) == 1 and values[0][0] == model._meta.pk.name else self._lookups.get(key)
+        if _row_key(model, pk) in self._rows:
+            return self._rows[_row_key(model, pk)]
+
+        instance = self.add(queryset.get(**lookup))
+        self._lookups[key] = instance.pk
+        return instance
+
+    def related(self, instance: models.Model, name: str) -> list:
+        # Loader for reverse and many to many relations, the rows behind instance.<name>.all() fetched once,
+        # or taken from prefetch_related when it already loaded them
+        key = (instance._meta.label, instance.pk, name)
+        if key not in self._related:
+            manager = getattr(instance, name)
+            self._related[key] = (manager.model._meta.label, [self.add(row) for row in manager.all()])
+        return self._related[key][1]
+
+
+def get_identity_map() -> Optional[IdentityMap]:
+    return _identity_map.get()
+
+
+def load(queryset: QuerySet, **lookup) -> models.Model:
+    """
+    queryset.get(**lookup) through the request's identity map, a plain query outside of requests.
+
+    Raises DoesNotExist like get. Lookups must be exact field names and hold every condition the row has
+    to meet, the queryset only says how to load it (select_related and the like), a row already in the
+    map is returned without it.
+    """
+    identity_map = get_identity_map()
+    if identity_map is None:
+        return queryset.get(**lookup)
+    return identity_map.get(queryset, **lookup)
+
+
+def load_related(instance: models.Model, name: str) -> list:
+    identity_map = get_identity_map()
+    if identity_map is None:
+        return list(getattr(instance, name).all())
+    return identity_map.related(instance, name)
+
+
+class IdentityMapMiddleware:
+    # Gives every request its own identity map, dropped when the response is returned
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _identity_map.set(IdentityMap())
+        try:
+            return self.get_response(request)
+        finally:
+            _identity_map.reset(token)
@@ -0,0 +1,367 @@
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction, connections, close_old_connections
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from apps.common.choices import QUEUED, RUNNING, SUCCEEDED, FAILED
+from apps.common.models import Job, ThrottleBucket
+
+logger = logging.getLogger(__name__)
+
+# How many due jobs the fallback claim tries before giving up on this poll
+CLAIM_CANDIDATES = 5
+
+SUPERSEDED_ERROR = 'Superseded by a queued job with the same key'
+
+_registry = {}
+
+_startup_hooks = []
+
+# Job being run by the current worker thread, see finish_current_job
+_current = threading.local()
+
+
+class JobClaimLost(Exception):
+    pass
+
+
+class JobHandler:
+    """
+    A function registered to run in the background under a job name.
+
+    Calling the handler runs it inline, `enqueue` stores a job for a worker to run it later.
+    Handlers can run more than once when they are retried, so they should be idempotent.
+    """
+
+    def __init__(self, func, name: str, priority: int = 0, max_attempts: int = None):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *, run_at=None, priority: int = None, key: str = None, **payload) -> Job:
+        return enqueue_job(self.name, payload, priority=self.priority if priority is None else priority,
+                           run_at=run_at, max_attempts=self.max_attempts, key=key)
+
+
+def job(name: str = None, priority: int = 0, max_attempts: int = None):
+    """
+    Register a function as a background job, keyed by its dotted path unless a name is given.
+
+    Keyword arguments passed to `enqueue` become the job payload, so they must be JSON serializable.
+    `run_at`, `priority` and `key` are reserved for scheduling the job.
+    """
+
+    def decorator(func) -> JobHandler:
+        handler = JobHandler(func, name or f"{func.__module__}.{func.__qualname__}", priority, max_attempts)
+        _registry[handler.name] = handler
+        return handler
+
+    return decorator
+
+
+def on_worker_start(func):
+    """
+    Register a function that runworker calls once when it starts, after the job modules are loaded.
+
+    Meant for seeding jobs that reschedule themselves, so they run after a deploy without waiting for a request.
+    """
+    _startup_hooks.append(func)
+    return func
+
+
+def run_worker_start_hooks() -> None:
+    for hook in _startup_hooks:
+        try:
+            hook()
+        except Exception:
+            logger.exception("Worker start hook %s failed", hook.__qualname__)
+
+
+def get_job_handler(name: str) -> Optional[JobHandler]:
+    return _registry.get(name)
+
+
+def enqueue_job(name: str, payload: dict = None, priority: int = 0, run_at=None, max_attempts: int = None,
+                key: str = None) -> Job:
+    # A job that is already waiting under the same key covers this one, e.g. one digest per user at a time
+    if key:
+        queued_job = Job.objects.filter(key=key, status=QUEUED).first()
+        if queued_job:
+            return queued_job
+
+    # Written in the caller's transaction, so the job only becomes visible to workers if the request succeeds
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                key=key,
+                payload=payload or {},
+                priority=priority,
+                run_at=run_at or timezone.now(),
+                max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        # Another request queued a job under the key since the check above, the constraint keeps it the only one
+        queued_job = Job.objects.filter(key=key, status=QUEUED).first()
+        if queued_job is None:
+            raise
+        return queued_job
+
+
+def claim_job(worker_id: str) -> Optional[Job]:
+    now = timezone.now()
+    due_jobs = Job.objects.filter(status=QUEUED, run_at__lte=now).order_by('-priority', 'run_at')
+
+    if connections[Job.objects.db].features.has_select_for_update_skip_locked:
+        # Rows locked by other workers are skipped instead of waited on, so workers never queue up behind each other
+        with transaction.atomic():
+            claimed = list(due_jobs.select_for_update(skip_locked=True)[:1])
+            if not claimed:
+                return None
+            claimed_job = claimed[0]
+            claimed_job.status = RUNNING
+            claimed_job.attempts += 1
+            claimed_job.claimed_by = worker_id
+            claimed_job.claimed_at = now
+            claimed_job.started_at = now
+            claimed_job.save(update_fields=['status', 'attempts', 'claimed_by', 'claimed_at', 'started_at', 'updated'])
+            return claimed_job
+
+    # Without SKIP LOCKED (SQLite), the status check makes the claim safe when several workers pick the same row
+    for job_id in due_jobs.values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(id=job_id, status=QUEUED).update(
+            status=RUNNING, attempts=F('attempts') + 1, claimed_by=worker_id, claimed_at=now, started_at=now,
+            updated=now
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def heartbeat_jobs(running: dict) -> int:
+    """
+    Refresh the claim on running jobs, given as a dict of job id to the worker id that claimed it.
+
+    Only jobs of a worker that stopped sending heartbeats go stale and are queued again.
+    """
+    if not running:
+        return 0
+    return Job.objects.filter(
+        id__in=list(running), claimed_by__in=set(running.values()), status=RUNNING
+    ).update(claimed_at=timezone.now())
+
+
+def requeue_stale_jobs() -> int:
+    # Jobs whose claim was not refreshed by a heartbeat belonged to a worker that died mid-job
+    stale_jobs = Job.objects.filter(
+        status=RUNNING, claimed_at__lt=timezone.now() - timedelta(seconds=settings.JOB_CLAIM_TIMEOUT)
+    )
+    stale_jobs.filter(attempts__gte=F('max_attempts')).update(
+        status=FAILED, finished_at=timezone.now(), last_error='Abandoned by worker'
+    )
+    # At most one job per key can be queued, one that is already waiting takes over from the stale one
+    stale_jobs.filter(key__in=Job.objects.filter(status=QUEUED, key__isnull=False).values('key')).update(
+        status=FAILED, finished_at=timezone.now(), last_error=SUPERSEDED_ERROR
+    )
+    return stale_jobs.update(status=QUEUED, claimed_by=None, claimed_at=None)
+
+
+def run_job(claimed_job: Job) -> None:
+    handler = get_job_handler(claimed_job.name)
+    if handler is None:
+        _mark_failed(claimed_job, f"No handler registered for {claimed_job.name}", retry=False)
+        return
+
+    _current.job = claimed_job
+    try:
+        handler(**claimed_job.payload)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", claimed_job.name, claimed_job.id)
+        _mark_failed(claimed_job, str(e))
+        return
+    finally:
+        _current.job = None
+
+    if claimed_job.status == SUCCEEDED:
+        return
+    now = timezone.now()
+    if not _claimed(claimed_job).update(status=SUCCEEDED, finished_at=now, updated=now):
+        logger.warning("Job %s (%s) finished after its claim was lost", claimed_job.name, claimed_job.id)
+
+
+def finish_current_job() -> None:
+    """
+    Mark the job being run as succeeded from inside the handler, in the handler's own transaction.
+
+    Handlers whose work can't safely run twice call this in the transaction that commits the work, so the work
+    and the job's outcome commit together and a rerun after a crash never repeats it. Raises JobClaimLost, rolling
+    the transaction back, when the job was queued again for another worker meanwhile. Does nothing when the
+    handler is called inline.
+    """
+    claimed_job = getattr(_current, 'job', None)
+    if claimed_job is None:
+        return
+    now = timezone.now()
+    if not _claimed(claimed_job).update(status=SUCCEEDED, finished_at=now, updated=now):
+        raise JobClaimLost(f"Job {claimed_job.name} ({claimed_job.id}) was claimed by another worker")
+    # Only final once the transaction commits, a rollback leaves the job running and run_job records the outcome
+    transaction.on_commit(lambda: setattr(claimed_job, 'status', SUCCEEDED))
+
+
+def _claimed(claimed_job: Job):
+    # The outcome is only recorded while this run still holds the claim, a requeued job belongs to its new run
+    return Job.objects.filter(id=claimed_job.id, status=RUNNING, claimed_by=claimed_job.claimed_by)
+
+
+def _mark_failed(failed_job: Job, error: str, retry: bool = True) -> None:
+    now = timezone.now()
+    fields = {'last_error': error, 'claimed_by': None, 'claimed_at': None, 'finished_at': now, 'updated': now}
+    if retry and failed_job.attempts < failed_job.max_attempts:
+        delay = settings.JOB_RETRY_DELAY * 2 ** (failed_job.attempts - 1)
+        fields.update(status=QUEUED, run_at=now + timedelta(seconds=delay))
+    else:
+        fields.update(status=FAILED)
+    try:
+        with transaction.atomic():
+            updated = _claimed(failed_job).update(**fields)
+    except IntegrityError:
+        # A job queued under the same key meanwhile runs instead of the retry
+        updated = _claimed(failed_job).update(**dict(fields, status=FAILED, last_error=f"{error}\n{SUPERSEDED_ERROR}"))
+    if not updated:
+        logger.warning("Job %s (%s) failed after its claim was lost", failed_job.name, failed_job.id)
+
+
+def _summarize(durations: list) -> dict:
+    if not durations:
+        return {'count': 0, 'avg': None, 'p95': None, 'max': None}
+    durations = sorted(durations)
+    return {
+        'count': len(durations),
+        'avg': round(statistics.fmean(durations), 3),
+        'p95': round(durations[int(0.95 * (len(durations) - 1))], 3),
+        'max': round(durations[-1], 3),
+    }
+
+
+def get_job_metrics(window: timedelta = timedelta(hours=1)) -> dict:
+    """
+    Queue depth per status and latency of the jobs finished within the window, in seconds.
+
+    Wait time runs from when a job became due to when a worker picked it up, run time from then until it finished.
+    """
+    now = timezone.now()
+    depth = dict(Job.objects.values_list('status').annotate(total=Count('id')).order_by())
+    due = Job.objects.filter(status=QUEUED, run_at__lte=now).aggregate(total=Count('id'), oldest=Min('run_at'))
+
+    finished = Job.objects.filter(status__in=[SUCCEEDED, FAILED], finished_at__gte=now - window).values_list(
+        'run_at', 'started_at', 'finished_at'
+    )
+    wait_times, run_times = [], []
+    for run_at, started_at, finished_at in finished.iterator():
+        if started_at:
+            wait_times.append(max((started_at - run_at).total_seconds(), 0))
+            run_times.append((finished_at - started_at).total_seconds())
+
+    return {
+        'depth': {status: depth.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)},
+        'due': due['total'],
+        'oldest_due_age': round((now - due['oldest']).total_seconds(), 3) if due['oldest'] else None,
+        'wait_time': _summarize(wait_times),
+        'run_time': _summarize(run_times),
+    }
+
+
+class Worker:
+    """
+    Fixed-size pool of threads that claim and run due jobs one at a time.
+
+    Stopping lets every thread finish the job it is running before it exits.
+    """
+
+    def __init__(self, threads: int = None, poll_interval: float = None):
+        self.threads = threads or settings.JOB_WORKER_THREADS
+        self.poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+        self._stop_event = threading.Event()
+        self._threads = []
+        # Worker id that claimed each job this process is running, by job id, kept alive by heartbeats from `wait`
+        self._running = {}
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def wait(self):
+        # Wake up regularly to send heartbeats, recover jobs from dead workers and report metrics
+        last_metrics = time.monotonic()
+        while not self._stop_event.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            try:
+                with self._running_lock:
+                    running = dict(self._running)
+                heartbeat_jobs(running)
+                requeue_stale_jobs()
+                if time.monotonic() - last_metrics >= settings.JOB_METRICS_INTERVAL:
+                    last_metrics = time.monotonic()
+                    logger.info("Job queue metrics: %s", get_job_metrics())
+            except Exception:
+                logger.exception("Job worker failed to send heartbeats or collect metrics")
+            finally:
+                close_old_connections()
+
+        for thread in self._threads:
+            thread.join()
+
+    def run(self):
+        requeue_stale_jobs()
+        self.start()
+        self.wait()
+
+    def _run(self):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while not self._stop_event.is_set():
+            try:
+                claimed_job = claim_job(worker_id)
+                if claimed_job:
+                    with self._running_lock:
+                        self._running[claimed_job.id] = claimed_job.claimed_by
+                    try:
+                        run_job(claimed_job)
+                    finally:
+                        with self._running_lock:
+                            self._running.pop(claimed_job.id, None)
+            except Exception:
+                logger.exception("Job worker failed to process a job")
+                claimed_job = None
+            finally:
+                close_old_connections()
+
+            if not claimed_job:
+                self._stop_event.wait(self.poll_interval)
+
+
+# Only one throttle pruning run is ever waiting, however many requests ask for one
+PRUNE_THROTTLE_BUCKETS_JOB_KEY = 'prune-throttle-buckets'
+
+
+@job('common.prune_throttle_buckets')
+def prune_throttle_buckets():
+    # tat has no index so allowed requests stay cheap to write, this scan runs off the request path instead
+    ThrottleBucket.objects.filter(tat__lt=time.time()).delete()
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.common.jobs import get_job_metrics
+
+
+class Command(BaseCommand):
+    help = 'Prints job queue depth and the latency of recently finished jobs.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(get_job_metrics(), indent=2))
@@ -0,0 +1,94 @@
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client
+
+from apps.common import passwords
+from apps.common.exceptions import PasswordHashPoolFull
+from apps.core.selectors import authenticate_user
+from apps.property.choices import APPROVED
+from apps.property.models import Property, PropertyMedia
+
+User = get_user_model()
+
+BENCH_EMAIL = 'passwordbench@example.com'
+BENCH_PASSWORD = 'bench-Passw0rd'
+
+
+class Command(BaseCommand):
+    help = ('Runs logins and listing reads side by side and reports listing latency, once with every login '
+            'hashing on its own request thread and once through the bounded password hash pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--login-threads', type=int, default=16)
+        parser.add_argument('--listing-threads', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10, help='How long each mode runs.')
+        parser.add_argument('--listings', type=int, default=20, help='Approved listings on the page read.')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(email=BENCH_EMAIL, password=BENCH_PASSWORD, email_verified=True)
+        listings = Property.objects.bulk_create([
+            Property(lister=user, name=f'Bench listing {index}', city='Athens', street='Bench', area='Bench',
+                     price=Decimal(100_000 + index), description='Bench listing', ad_status=APPROVED)
+            for index in range(options['listings'])
+        ])
+        PropertyMedia.objects.bulk_create([
+            PropertyMedia(property=listing, media='property_media/bench.jpg') for listing in listings
+        ])
+
+        pooled = passwords.password_hash_pool
+        modes = (
+            # As many hashing threads as logins, the same as hashing on the request threads
+            ('unbounded', passwords.PasswordHashPool(options['login_threads'], 0)),
+            (f'pool of {pooled.workers}', pooled),
+        )
+        try:
+            for label, pool in modes:
+                passwords.password_hash_pool = pool
+                cache.clear()
+                self.stdout.write(f'{label:>12}: {self.run_mixed(**options)}')
+        finally:
+            passwords.password_hash_pool = pooled
+            user.delete()
+
+    def run_mixed(self, login_threads: int, listing_threads: int, seconds: float, **options) -> str:
+        stop = threading.Event()
+        latencies, logins = [], {'ok': 0, 'rejected': 0}
+
+        def login():
+            while not stop.is_set():
+                try:
+                    authenticate_user(BENCH_EMAIL, BENCH_PASSWORD)
+                    logins['ok'] += 1
+                except PasswordHashPoolFull:
+                    logins['rejected'] += 1
+                    time.sleep(0.05)
+            close_old_connections()
+
+        def read_listings():
+            client = Client(HTTP_HOST='localhost')
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.get('/api/v1/property/listings/all')
+                assert response.status_code == 200, response.content
+                latencies.append(time.perf_counter() - started)
+            close_old_connections()
+
+        threads = [threading.Thread(target=login) for _ in range(login_threads)]
+        threads += [threading.Thread(target=read_listings) for _ in range(listing_threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        return (f'{len(latencies) / seconds:6.1f} listing reads/s, p50 {p50:7.1f}ms, p99 {p99:7.1f}ms, '
+                f"{logins['ok'] / seconds:5.1f} logins/s, {logins['rejected']} logins turned away")
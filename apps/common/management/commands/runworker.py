@@ -0,0 +1,65 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+from apps.common.jobs import Worker, run_worker_start_hooks
+from utilities.emails import get_email_sender
+
+
+def run_worker_process(threads: int):
+    worker = Worker(threads=threads)
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    signal.signal(signal.SIGINT, lambda *args: worker.stop())
+
+    # Drains the email outbox alongside the jobs, so mail left pending by a restart or waiting on a
+    # retry goes out without another email being queued first
+    email_sender = get_email_sender()
+    email_sender.start()
+    try:
+        worker.run()
+    finally:
+        email_sender.stop()
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs from the job queue and sends emails from the outbox until it is stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES)
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads per process.')
+
+    def handle(self, *args, **options):
+        # Job handlers live in each app's jobs module and register themselves on import
+        autodiscover_modules('jobs')
+        run_worker_start_hooks()
+
+        processes, threads = options['processes'], options['threads']
+        self.stdout.write(f'Starting {processes} worker process(es) with {threads} thread(s) each.')
+
+        if processes <= 1:
+            run_worker_process(threads)
+            return
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=run_worker_process, args=(threads,), name=f'job-worker-process-{index}')
+            for index in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop_children(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, stop_children)
+        for child in children:
+            child.join()
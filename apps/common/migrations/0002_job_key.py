@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='key',
+            field=models.CharField(blank=True, db_index=True, help_text='At most one queued job per key', max_length=255, null=True),
+        ),
+    ]
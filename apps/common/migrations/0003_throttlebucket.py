@@ -0,0 +1,20 @@
+# Generated by Django 4.2.5 on 2026-10-18 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_job_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('tat', models.FloatField(db_index=True, help_text='Theoretical arrival time of the next request, in epoch seconds')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_throttlebucket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='throttlebucket',
+            name='tat',
+            field=models.FloatField(help_text='Theoretical arrival time of the next request, in epoch seconds'),
+        ),
+    ]
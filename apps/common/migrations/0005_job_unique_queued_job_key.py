@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+def fail_duplicate_queued_jobs(apps, schema_editor):
+    # Keeps the oldest queued job per key, the constraint allows no more
+    Job = apps.get_model('common', 'Job')
+    seen = set()
+    for job_id, key in Job.objects.filter(status='QUEUED', key__isnull=False).order_by('created') \
+            .values_list('id', 'key'):
+        if key in seen:
+            Job.objects.filter(id=job_id).update(status='FAILED',
+                                                 last_error='Superseded by a queued job with the same key')
+        seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_alter_throttlebucket_tat'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_queued_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'QUEUED')), fields=('key',),
+                                               name='unique_queued_job_key'),
+        ),
+    ]
@@ -1,12 +1,28 @@
-from uuid import uuid4
+import datetime
+from decimal import Decimal
+from uuid import UUID, uuid4
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+from apps.common.choices import JOB_STATUS, QUEUED
 
 
 # Create your models here.
 
+# Values that can't be changed in place, anything else (JSON dicts and lists, files) is written on every save
+IMMUTABLE_TYPES = (str, bytes, int, float, bool, Decimal, UUID, datetime.date, datetime.time, datetime.timedelta,
+                   type(None))
+
 
 class BaseModel(models.Model):
+    """
+    Rows remember the column values they were loaded with, saving one that came from the database writes only
+    the columns that changed since (and `updated`) instead of every column.
+
+    Passing update_fields to save works as usual. Rows being inserted are saved in full.
+    """
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
     created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True, null=True)
@@ -14,3 +30,80 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
         ordering = ("-created",)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_fields()
+        return instance
+
+    def snapshot_fields(self, attnames=None) -> None:
+        # Deferred fields are left out, their loaded value is unknown and they count as changed once set
+        if attnames is None:
+            attnames = [field.attname for field in self._meta.concrete_fields]
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            if attname in self.__dict__:
+                loaded[attname] = self.__dict__[attname]
+
+    def get_changed_fields(self) -> dict:
+        # Loaded values of the columns set to something else since, keyed by attname
+        loaded = self.__dict__.get('_loaded_values', {})
+        changed = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            value = self.__dict__[field.attname]
+            if field.attname not in loaded or not isinstance(value, IMMUTABLE_TYPES) or value != loaded[field.attname]:
+                changed[field.attname] = loaded.get(field.attname)
+        return changed
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and '_loaded_values' in self.__dict__ and not args \
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [*self.get_changed_fields(), 'updated']
+        super().save(*args, **kwargs)
+        self.snapshot_fields(kwargs.get('update_fields') and
+                             [self._meta.get_field(name).attname for name in kwargs['update_fields']])
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.snapshot_fields(fields and [self._meta.get_field(name).attname for name in fields])
+
+
+class Job(BaseModel):
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, null=True, blank=True, db_index=True,
+                           help_text="At most one queued job per key")
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    priority = models.IntegerField(default=0, help_text="Higher priority jobs run first")
+    status = models.CharField(max_length=20, choices=JOB_STATUS, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=255, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ("-created",)
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status=QUEUED), name='unique_queued_job_key'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ThrottleBucket(models.Model):
+    # One row per throttled client and scope, shared by every worker process
+    key = models.CharField(max_length=255, primary_key=True)
+    tat = models.FloatField(help_text="Theoretical arrival time of the next request, in epoch seconds")
+
+    def __str__(self):
+        return self.key
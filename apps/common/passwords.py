@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from apps.common.exceptions import PasswordHashPoolFull
+
+
+class PasswordHashPool:
+    """
+    Runs password hashing on a few dedicated threads, so a burst of logins or sign-ups can use at most
+    `workers` cores' worth of CPU and every other request keeps the rest.
+
+    Up to `queue_size` more callers wait for a free thread, past that PasswordHashPoolFull is raised,
+    which API views answer with a 503, instead of piling up on the server.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashPoolFull()
+        try:
+            return self._executor.submit(func, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+
+password_hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's default hasher, with hashing and checking run through the password hash pool.
+
+    Everything that touches passwords goes through it: authenticate, set_password, check_password
+    and the user manager, without changing the stored hashes.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        return password_hash_pool.run(super().encode, password, salt, iterations)
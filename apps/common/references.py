@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+
+class ReferenceCache:
+    """
+    Every row of a small lookup table held in this process by primary key, so resolving ids of property
+    types, categories and the like needs no query.
+
+    Rows are reloaded every REFERENCE_DATA_TTL seconds, right away when this process saves or deletes one,
+    and when an id is asked for that isn't known yet, which picks up rows added by other processes.
+    The instances are shared between requests and must be treated as read only.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._rows = None
+        self._expires_at = 0
+        post_save.connect(self._changed, sender=model, weak=False)
+        post_delete.connect(self._changed, sender=model, weak=False)
+
+    def __deepcopy__(self, memo):
+        # Serializer fields are deep copied per serializer instance, they all share this process's cache
+        return self
+
+    def _changed(self, **kwargs):
+        self.invalidate()
+
+    def _load(self) -> dict:
+        rows = self.model._default_manager.in_bulk()
+        with self._lock:
+            self._rows = rows
+            self._expires_at = time.monotonic() + settings.REFERENCE_DATA_TTL
+        return rows
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rows = None
+
+    def get_many(self, pks) -> dict:
+        with self._lock:
+            rows = self._rows if time.monotonic() < self._expires_at else None
+        if rows is None:
+            rows = self._load()
+        if not rows.keys() >= set(pks):
+            rows = self._load()
+        return {pk: rows[pk] for pk in pks if pk in rows}
@@ -0,0 +1,75 @@
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
+from rest_framework import serializers as sr
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BatchLoadListSerializer(sr.ListSerializer):
+    """
+    List serializer that loads the relations its child reads for every item in one query per relation,
+    before serializing them one by one as usual, so the output is the same as without it.
+
+    A serializer opts in with `list_serializer_class = BatchLoadListSerializer` in its Meta and lists the
+    relations its fields and methods follow in `batch_load`, as prefetch_related lookups. Items that
+    already have a relation loaded are not loaded again.
+    """
+
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, BaseManager) else data)
+        prefetch_related_objects(instances, *getattr(self.child, 'batch_load', ()))
+        return super().to_representation(instances)
+
+
+class BulkManyRelatedField(sr.ManyRelatedField):
+    # Hands the whole list of ids to the child field at once instead of one id at a time
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.get_many(list(data))
+
+
+class BulkPrimaryKeyRelatedField(sr.PrimaryKeyRelatedField):
+    """
+    Primary key related field that resolves ids in bulk, with many=True all of them in one `in` query
+    instead of a query per id, and with `reference` from a ReferenceCache without a query at all.
+
+    Errors are the same as PrimaryKeyRelatedField's. A reference cache holds every row of its table, so it
+    is only for fields whose queryset is the whole table.
+    """
+
+    def __init__(self, reference=None, **kwargs):
+        self.reference = reference
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        return self.get_many([data])[0]
+
+    def get_many(self, data: list) -> list:
+        queryset = self.get_queryset()
+        pks = []
+        for item in data:
+            if self.pk_field is not None:
+                item = self.pk_field.to_internal_value(item)
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (TypeError, ValueError):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+
+        rows = self.reference.get_many(pks) if self.reference is not None else queryset.in_bulk(set(pks))
+        for item, pk in zip(data, pks):
+            if pk not in rows:
+                self.fail('does_not_exist', pk_value=item)
+        return [rows[pk] for pk in pks]
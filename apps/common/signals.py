@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.common.identity import get_identity_map
+
+
+@receiver(post_save)
+def remember_saved_row(sender, instance, **kwargs):
+    identity_map = get_identity_map()
+    if identity_map is not None:
+        identity_map.changed(instance)
+
+
+@receiver(post_delete)
+def forget_deleted_row(sender, instance, **kwargs):
+    identity_map = get_identity_map()
+    if identity_map is not None:
+        identity_map.changed(instance, deleted=True)
@@ -0,0 +1,74 @@
+import random
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from rest_framework import throttling
+
+from apps.common.jobs import prune_throttle_buckets, PRUNE_THROTTLE_BUCKETS_JOB_KEY
+from apps.common.models import ThrottleBucket
+
+
+class GCRARateThrottle(throttling.SimpleRateThrottle):
+    """
+    Replaces the request history DRF keeps in the cache with a GCRA counter in the database, one row
+    per client and scope updated by a single conditional UPDATE. Every worker process shares it and each
+    request costs the same whatever the rate.
+
+    The stored time moves forward by period / requests on every allowed request, a request is refused
+    while it is more than one period minus one interval ahead of now. That lets a client use its whole
+    allowance in a burst, as before, then one request per interval.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        interval = self.duration / self.num_requests
+        tolerance = self.duration - interval
+        self.retry_after = 0
+
+        allowed = self._take(interval, tolerance)
+        if not allowed:
+            bucket, allowed = ThrottleBucket.objects.get_or_create(
+                key=self.key, defaults={'tat': self.now + interval}
+            )
+            # Another request created the row first, this one still gets its share of the budget
+            if not allowed:
+                allowed = self._take(interval, tolerance)
+            if not allowed:
+                self.retry_after = bucket.tat - self.now - tolerance
+
+        # Rows behind the clock mean the same as no row, cleared now and then by a background job
+        if random.random() < settings.THROTTLE_PRUNE_PROBABILITY:
+            prune_throttle_buckets.enqueue(key=PRUNE_THROTTLE_BUCKETS_JOB_KEY)
+
+        return bool(allowed)
+
+    def _take(self, interval: float, tolerance: float) -> int:
+        return ThrottleBucket.objects.filter(key=self.key, tat__lte=self.now + tolerance) \
+            .update(tat=Greatest(F('tat'), Value(self.now)) + interval)
+
+    def wait(self):
+        return max(self.retry_after, 0)
+
+
+# DRF's classes come first for how they pick the key and rate, the counting is GCRARateThrottle's
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, GCRARateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, GCRARateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, GCRARateThrottle):
+    # Only throttles views that set throttle_scope, by user or by IP for anonymous requests
+    pass
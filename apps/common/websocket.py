@@ -0,0 +1,65 @@
+import time
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from apps.common.authentication import ClaimsJWTAuthentication
+
+
+@database_sync_to_async
+def get_token_user(raw_token: str):
+    authentication = ClaimsJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+def get_raw_token(scope) -> str:
+    # Browsers can't set headers on a websocket handshake, so the token may also come as ?token=
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                return parts[1]
+
+    tokens = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    return tokens[0] if tokens else None
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate websocket connections with the same SimpleJWT access tokens as the REST API.
+
+    Connections without a valid token get an AnonymousUser in scope["user"].
+    """
+
+    async def __call__(self, scope, receive, send):
+        raw_token = get_raw_token(scope)
+        user = await get_token_user(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(dict(scope, user=user), receive, send)
+
+
+class SweepingInMemoryChannelLayer(InMemoryChannelLayer):
+    """
+    In-memory channel layer that sweeps expired messages at most once per `sweep_interval` seconds.
+
+    The stock layer walks every channel on each receive, so one push to N sessions costs O(N^2).
+    """
+
+    def __init__(self, sweep_interval: float = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        super()._clean_expired()
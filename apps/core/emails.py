@@ -2,7 +2,6 @@ import pyotp
 from django.contrib.auth import get_user_model
 from django.contrib.sites.shortcuts import get_current_site
 from django.http import HttpRequest
-from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
@@ -28,10 +27,8 @@ def send_email_verification(request: HttpRequest, recipient: User, template: str
                'protocol': 'https' if request.is_secure() else 'http',
                'token': account_activation_token.make_token(recipient), }
 
-    message = render_to_string(template, context)
-
     # Send the email
-    send_email(subject, recipients, message=message, template=template, context=context)
+    send_email(subject, recipients, template=template, context=context)
 
 
 def decode_otp_from_secret(otp_secret: str) -> str:
@@ -56,7 +53,6 @@ def send_otp_email(otp_secret: str, recipient: str or User, template=None) -> No
     subject = 'One-Time Password (OTP) Verification'
     recipients = [email_address]
     context = {'email': email_address, 'otp': otp}
-    message = render_to_string(template, context)
 
     # Send the email
-    send_email(subject, recipients, message=message, template=template, context=context)
+    send_email(subject, recipients, template=template, context=context)
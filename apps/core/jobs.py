@@ -0,0 +1,23 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.common.jobs import job
+from apps.core.tokens import prune_expired_tokens
+
+logger = logging.getLogger(__name__)
+
+# Only one pruning run is ever waiting, however often it is scheduled
+PRUNE_TOKENS_JOB_KEY = 'prune-expired-tokens'
+
+
+@job('core.prune_tokens')
+def prune_tokens():
+    logger.info("Pruned expired tokens: %s", prune_expired_tokens())
+    schedule_token_pruning(run_at=timezone.now() + timedelta(seconds=settings.TOKEN_PRUNE_INTERVAL))
+
+
+def schedule_token_pruning(run_at=None):
+    return prune_tokens.enqueue(run_at=run_at, key=PRUNE_TOKENS_JOB_KEY)
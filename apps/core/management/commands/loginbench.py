@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, close_old_connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from apps.core.tokens import outstanding_token_buffer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Measures token issuance at login with outstanding tokens inserted one per login and with the '
+            'buffered bulk inserts. Password hashing is left out, it costs the same in both modes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=5000, help='Logins timed per mode.')
+        parser.add_argument('--threads', type=int, default=1, help='Threads issuing tokens concurrently.')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(email='loginbench@example.com')
+        buffered = settings.TOKEN_OUTSTANDING_BUFFERED
+        try:
+            for mode in (False, True):
+                settings.TOKEN_OUTSTANDING_BUFFERED = mode
+                with CaptureQueriesContext(connection) as queries:
+                    user.tokens()
+                rate, flush_time = self.time_logins(user, options['logins'], options['threads'])
+                self.stdout.write(
+                    f"{'buffered' if mode else 'per login':>10}: {rate:8.0f} logins/s, "
+                    f"{len(queries)} queries in the request, flushed in {flush_time:.2f}s, "
+                    f"{OutstandingToken.objects.filter(user=user).count()} tokens recorded"
+                )
+                OutstandingToken.objects.filter(user=user).delete()
+        finally:
+            settings.TOKEN_OUTSTANDING_BUFFERED = buffered
+            outstanding_token_buffer.flush()
+            OutstandingToken.objects.filter(user=user).delete()
+            user.delete()
+
+    @staticmethod
+    def time_logins(user, count: int, threads: int) -> tuple:
+        def login(_):
+            try:
+                return user.tokens()
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(login, range(count)))
+        elapsed = time.perf_counter() - started
+
+        # Whatever is still buffered is written outside the timed logins, reported separately
+        flush_started = time.perf_counter()
+        outstanding_token_buffer.flush()
+        return count / elapsed, time.perf_counter() - flush_started
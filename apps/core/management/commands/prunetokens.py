@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core.jobs import schedule_token_pruning
+from apps.core.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired outstanding tokens and their blacklist entries in small batches. '
+            'Safe to run while the API is serving traffic.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.TOKEN_PRUNE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches.')
+        parser.add_argument('--schedule', action='store_true',
+                            help='Queue the recurring pruning job for the workers instead of pruning now.')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            scheduled = schedule_token_pruning()
+            self.stdout.write(f'Token pruning scheduled for {scheduled.run_at:%Y-%m-%d %H:%M:%S %Z}.')
+            return
+
+        result = prune_expired_tokens(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(
+            f"Removed {result['outstanding']} outstanding and {result['blacklisted']} blacklisted tokens "
+            f"in {result['batches']} batches in {result['seconds']:.2f}s."
+        )
@@ -0,0 +1,72 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+from apps.core.serializers import TokenRefreshSerializer
+from apps.core.tokens import RefreshToken, blacklist_index
+
+User = get_user_model()
+
+# Rows created by the benchmark, removed again when it finishes
+BENCH_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = ('Grows the token blacklist in steps and measures refresh throughput at each size, with the stock '
+            'SimpleJWT serializer and with the Bloom filter in front of the blacklist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[0, 100_000, 1_000_000],
+                            help='Blacklist sizes to measure at.')
+        parser.add_argument('--refreshes', type=int, default=2000, help='Refreshes timed per serializer and size.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(email='tokenbench@example.com')
+        refresh_tokens = [str(RefreshToken.for_user(user)) for _ in range(100)]
+
+        try:
+            blacklisted = 0
+            for size in sorted(options['sizes']):
+                self.seed(size - blacklisted, options['batch_size'])
+                blacklisted = max(size, blacklisted)
+
+                started = time.perf_counter()
+                blacklist_index._filter = None
+                blacklist_index._next_sync = 0
+                blacklist_index.sync()
+                build_time = time.perf_counter() - started
+
+                stock = self.time_refreshes(jwt_serializers.TokenRefreshSerializer, refresh_tokens, options['refreshes'])
+                filtered = self.time_refreshes(TokenRefreshSerializer, refresh_tokens, options['refreshes'])
+                self.stdout.write(
+                    f'{blacklisted:>10} blacklisted: stock {stock:8.0f}/s, bloom {filtered:8.0f}/s, '
+                    f'filter built in {build_time:.2f}s'
+                )
+        finally:
+            OutstandingToken.objects.filter(jti__startswith=BENCH_PREFIX).delete()
+            OutstandingToken.objects.filter(user=user).delete()
+            user.delete()
+
+    def seed(self, count: int, batch_size: int):
+        expires_at = timezone.now() + timedelta(days=1)
+        for start in range(0, count, batch_size):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(jti=f'{BENCH_PREFIX}{uuid.uuid4().hex}', token='', expires_at=expires_at)
+                for _ in range(min(batch_size, count - start))
+            ])
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+
+    @staticmethod
+    def time_refreshes(serializer_class, refresh_tokens: list, count: int) -> float:
+        started = time.perf_counter()
+        for index in range(count):
+            serializer = serializer_class(data={'refresh': refresh_tokens[index % len(refresh_tokens)]})
+            serializer.is_valid(raise_exception=True)
+        return count / (time.perf_counter() - started)
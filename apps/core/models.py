@@ -1,10 +1,10 @@
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.db import models
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.common.models import BaseModel
 from apps.core.managers import CustomUserManager
+from apps.core.tokens import RefreshToken
 from apps.core.validators import validate_phone_number
 
 
@@ -3,7 +3,9 @@ from rest_framework import status
 
 from apps.common.errors import ErrorCode
 from apps.common.exceptions import RequestError
+from apps.common.identity import load
 from apps.core.emails import decode_otp_from_secret
+from apps.core.models import CompanyProfile, NormalProfile
 from apps.core.serializers import CompanyProfileSerializer, NormalProfileSerializer
 
 User = get_user_model()
@@ -25,16 +27,16 @@ def check_email_verification(user):
 
 def get_user_profile(user, is_agent):
     if is_agent:
-        return CompanyProfileSerializer(user.company_profile)
+        return CompanyProfileSerializer(load(CompanyProfile.objects.select_related('user'), user=user))
     else:
         # Assuming you have a different serializer for non-agent users
-        return NormalProfileSerializer(user.profile)
+        return NormalProfileSerializer(load(NormalProfile.objects.select_related('user'), user=user))
 
 
 def get_existing_user(email):
     # Check if a user with the specified email exists
     try:
-        user = User.objects.get(email=email)
+        user = load(User.objects, email=email)
     except User.DoesNotExist:
         return None  # User does not exist
 
@@ -54,7 +56,7 @@ def get_existing_user(email):
 
 def get_user(email):
     try:
-        return User.objects.get(email=email)
+        return load(User.objects, email=email)
     except User.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="User with this email not found",
                            status_code=status.HTTP_404_NOT_FOUND)
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.core import validators
 from django.core.validators import validate_email
+from drf_spectacular.contrib.rest_framework_simplejwt import TokenRefreshSerializerExtension
 from rest_framework import serializers as sr
+from rest_framework_simplejwt import serializers as jwt_serializers
 
+from apps.core.tokens import RefreshToken
 from apps.core.validators import validate_phone_number
 
 User = get_user_model()
@@ -145,6 +148,19 @@ class LoginSerializer(sr.Serializer):
     is_agent = sr.BooleanField(default=False)
 
 
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class CoreTokenRefreshSerializerExtension(TokenRefreshSerializerExtension):
+    # Documents the subclass like SimpleJWT's own refresh serializer
+    target_class = TokenRefreshSerializer
+
+
+class TokenBlacklistSerializer(jwt_serializers.TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
 class ChangePasswordSerializer(sr.Serializer):
     password = sr.CharField(max_length=20, min_length=8, write_only=True, validators=[validators.RegexValidator(
         regex=r'[!@#$%^&*(),.?":{}|<>]',
@@ -1,6 +1,22 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.db import IntegrityError, transaction, close_old_connections
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 from six import text_type
 
+from utilities.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
 
 class TokenGenerator(PasswordResetTokenGenerator):
     def _make_hash_value(self, user, timestamp):
@@ -11,3 +27,225 @@ class TokenGenerator(PasswordResetTokenGenerator):
 
 
 account_activation_token = TokenGenerator()
+
+
+# Each sync reads this many ids back, a row whose transaction committed after a higher id was read still gets in.
+# Rows that commit later than that are picked up by the next full rebuild.
+BLACKLIST_RESCAN_IDS = 1000
+
+
+class BlacklistIndex:
+    """
+    Per-process Bloom filter of blacklisted token ids, so checking a token that was never blacklisted
+    needs no query.
+
+    Rows blacklisted by other processes are picked up by id at most every TOKEN_BLACKLIST_SYNC_INTERVAL
+    seconds, tokens blacklisted in this process are added right away. The filter is rebuilt from the whole
+    table every TOKEN_BLACKLIST_REBUILD_INTERVAL seconds, which catches rows that committed too late for the
+    id window, and twice as large once it holds more than it was sized for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._recent_ids = set()
+        self._next_sync = 0
+        self._next_rebuild = 0
+
+    def _rebuild(self, capacity: int) -> None:
+        self._next_rebuild = time.monotonic() + settings.TOKEN_BLACKLIST_REBUILD_INTERVAL
+        self._filter = BloomFilter(capacity, settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE)
+        self._last_id = 0
+        self._recent_ids = set()
+        self._load()
+
+    def _load(self) -> None:
+        rows = BlacklistedToken.objects.order_by('id').values_list('id', 'token__jti')
+        start = max(self._last_id - BLACKLIST_RESCAN_IDS, 0)
+        while True:
+            batch = list(rows.filter(id__gt=start)[:10000])
+            if not batch:
+                break
+            new_rows = [(row_id, jti) for row_id, jti in batch if row_id not in self._recent_ids]
+            self._filter.update(jti for _, jti in new_rows)
+            self._recent_ids.update(row_id for row_id, _ in new_rows)
+
+            start = batch[-1][0]
+            self._last_id = max(self._last_id, start)
+            self._recent_ids = {row_id for row_id in self._recent_ids if row_id > self._last_id - BLACKLIST_RESCAN_IDS}
+
+    def sync(self) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            if self._filter is None or time.monotonic() >= self._next_rebuild:
+                self._rebuild(max(BlacklistedToken.objects.count() * 2, settings.TOKEN_BLACKLIST_BLOOM_CAPACITY))
+            else:
+                self._load()
+                if len(self._filter) > self._filter.capacity:
+                    self._rebuild(len(self._filter) * 2)
+            self._next_sync = time.monotonic() + settings.TOKEN_BLACKLIST_SYNC_INTERVAL
+
+    def might_contain(self, jti: str) -> bool:
+        self.sync()
+        return jti in self._filter
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+
+blacklist_index = BlacklistIndex()
+
+
+class OutstandingTokenBuffer:
+    """
+    Outstanding token rows waiting to be inserted in one bulk insert instead of one INSERT per login.
+
+    A background thread flushes the buffer every TOKEN_OUTSTANDING_FLUSH_INTERVAL seconds, or as soon as
+    TOKEN_OUTSTANDING_FLUSH_SIZE rows are waiting, and once more when the process exits. Rows of a process
+    that dies in between are lost, the tokens stay valid and blacklisting one records it again. The same goes
+    for rows that can't be inserted and for the oldest rows once TOKEN_OUTSTANDING_BUFFER_LIMIT are waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._tokens = []
+        self._thread = None
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='outstanding-token-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(settings.TOKEN_OUTSTANDING_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush outstanding tokens")
+            finally:
+                close_old_connections()
+
+    def add(self, token: OutstandingToken) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            # While the database is unreachable the oldest rows make room, as they would be lost with the process
+            dropped = len(self._tokens) - settings.TOKEN_OUTSTANDING_BUFFER_LIMIT + 1
+            if dropped > 0:
+                del self._tokens[:dropped]
+                logger.warning("Outstanding token buffer is full, dropped %s token(s)", dropped)
+            self._tokens.append(token)
+            if len(self._tokens) >= settings.TOKEN_OUTSTANDING_FLUSH_SIZE:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                tokens, self._tokens = self._tokens, []
+            try:
+                # A token blacklisted before its flush already has its row, the buffered one is skipped.
+                # The savepoint keeps a failed insert from breaking a transaction the caller has open.
+                with transaction.atomic():
+                    OutstandingToken.objects.bulk_create(tokens, batch_size=1000, ignore_conflicts=True)
+            except IntegrityError:
+                # e.g. a user deleted since login, that row alone is dropped instead of failing every flush after
+                return self._insert_each(tokens)
+            except Exception:
+                with self._lock:
+                    self._tokens[:0] = tokens
+                raise
+            return len(tokens)
+
+    def _insert_each(self, tokens: list) -> int:
+        inserted = 0
+        for token in tokens:
+            try:
+                with transaction.atomic():
+                    OutstandingToken.objects.bulk_create([token], ignore_conflicts=True)
+                inserted += 1
+            except IntegrityError:
+                logger.warning("Dropped outstanding token %s of user %s", token.jti, token.user_id, exc_info=True)
+        return inserted
+
+    def __contains__(self, jti: str) -> bool:
+        with self._lock:
+            return any(token.jti == jti for token in self._tokens)
+
+
+outstanding_token_buffer = OutstandingTokenBuffer()
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token that asks the blacklist index before querying the blacklist table, and records
+    issued tokens through the outstanding token buffer when TOKEN_OUTSTANDING_BUFFERED is on.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        if not settings.TOKEN_OUTSTANDING_BUFFERED:
+            return super().for_user(user)
+
+        # Skips BlacklistMixin.for_user, which inserts the row right away
+        token = super(BlacklistMixin, cls).for_user(user)
+        outstanding_token_buffer.add(OutstandingToken(
+            user_id=user.pk,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        ))
+        return token
+
+    def check_blacklist(self) -> None:
+        # Only a possible hit costs a query, to rule out a false positive
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        # Keeps the row that knows the token's user and issue time instead of the bare one blacklisting creates
+        if self.payload[api_settings.JTI_CLAIM] in outstanding_token_buffer:
+            outstanding_token_buffer.flush()
+        blacklisted = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+
+def prune_expired_tokens(batch_size: int = None, pause: float = 0) -> dict:
+    """
+    Delete outstanding tokens that have expired, with their blacklist entries, in batches walked by id.
+
+    Each batch is its own short transaction, so logins and logouts are never blocked behind the whole run.
+    `pause` sleeps between batches to leave the database some room on a busy server.
+    """
+    batch_size = batch_size or settings.TOKEN_PRUNE_BATCH_SIZE
+    started = time.perf_counter()
+    expired = OutstandingToken.objects.filter(expires_at__lt=timezone.now()).order_by('id')
+
+    result = {'outstanding': 0, 'blacklisted': 0, 'batches': 0}
+    last_id = 0
+    while True:
+        ids = list(expired.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            # Deleted first so the outstanding rows go without a cascade lookup
+            result['blacklisted'] += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            result['outstanding'] += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        result['batches'] += 1
+        last_id = ids[-1]
+
+        if pause:
+            time.sleep(pause)
+
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
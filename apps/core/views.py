@@ -4,15 +4,14 @@ from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 from drf_spectacular.utils import OpenApiResponse, extend_schema, OpenApiExample
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenRefreshSerializer, \
-    TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenBlacklistView, TokenRefreshView
 
 from apps.common.permissions import IsAuthenticatedUser
 from apps.common.responses import CustomResponse
+from apps.common.throttles import AnonRateThrottle, UserRateThrottle
 from apps.core.emails import send_email_verification, send_otp_email
 from apps.core.models import NormalProfile, CompanyProfile
 from apps.core.selectors import *
@@ -87,6 +86,9 @@ class NormalRegistrationView(APIView):
         try:
             user = User.objects.create_user(full_name=full_name, **serializer.validated_data)
             user_profile = NormalProfile.objects.create(user=user)
+        except PasswordHashPoolFull:
+            # Answered with a 503 by the exception handler, the input was fine
+            raise
         except Exception as e:
             raise RequestError(err_code=ErrorCode.OTHER_ERROR, err_msg=str(e),
                                status_code=status.HTTP_400_BAD_REQUEST)
@@ -159,6 +161,9 @@ class CompanyRegistrationView(APIView):
             user = User.objects.create_user(**serializer.validated_data, is_agent=True)
             user_profile = CompanyProfile.objects.create(user=user, company_name=company_name,
                                                          license_number=licence_number)
+        except PasswordHashPoolFull:
+            # Answered with a 503 by the exception handler, the input was fine
+            raise
         except Exception as e:
             raise RequestError(err_code=ErrorCode.OTHER_ERROR, err_msg=str(e),
                                status_code=status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,37 @@
 from django.contrib import admin
 
+from apps.notification.models import EmailOutbox, Notification
+
+
 # Register your models here.
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    list_per_page = 20
+    search_fields = ('subject',)
+    readonly_fields = ('claimed_by', 'claimed_at', 'sent_at', 'last_error')
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        'title',
+        'recipient',
+        'notification_type',
+        'read',
+        'created',
+    )
+    list_filter = ('notification_type', 'read')
+    list_per_page = 20
+    search_fields = ('title', 'recipient__email')
+    raw_id_fields = ('recipient',)
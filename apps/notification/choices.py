@@ -0,0 +1,27 @@
+PENDING = 'PENDING'
+SENDING = 'SENDING'
+SENT = 'SENT'
+FAILED = 'FAILED'
+
+EMAIL_STATUS = (
+    (PENDING, 'Pending'),
+    (SENDING, 'Sending'),
+    (SENT, 'Sent'),
+    (FAILED, 'Failed'),
+)
+
+CONTACT_REQUEST = 'CONTACT_REQUEST'
+AD_APPROVED = 'AD_APPROVED'
+AD_REJECTED = 'AD_REJECTED'
+AD_TERMINATED = 'AD_TERMINATED'
+SAVED_SEARCH_MATCH = 'SAVED_SEARCH_MATCH'
+PRICE_DROP = 'PRICE_DROP'
+
+NOTIFICATION_TYPES = (
+    (CONTACT_REQUEST, 'Contact request'),
+    (AD_APPROVED, 'Ad approved'),
+    (AD_REJECTED, 'Ad rejected'),
+    (AD_TERMINATED, 'Ad terminated'),
+    (SAVED_SEARCH_MATCH, 'Saved search match'),
+    (PRICE_DROP, 'Price drop'),
+)
@@ -0,0 +1,30 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+
+def get_notification_group(user_id) -> str:
+    return f"notifications.{user_id}"
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes every new notification of the authenticated user to all of their open sessions.
+
+    The client never sends anything, each session only listens on its user's group.
+    """
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = get_notification_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_message(self, event):
+        await self.send_json(event['notification'])
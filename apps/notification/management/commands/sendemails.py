@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from utilities.emails import EmailSender
+
+
+class Command(BaseCommand):
+    help = 'Sends every email in the outbox that is due, then exits.'
+
+    def handle(self, *args, **options):
+        sender = EmailSender(workers=1)
+
+        total = 0
+        while sent := sender.send_due_batch():
+            total += sent
+
+        self.stdout.write(f'Processed {total} emails.')
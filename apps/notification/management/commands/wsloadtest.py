@@ -0,0 +1,68 @@
+import asyncio
+import resource
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.notification.consumers import get_notification_group
+
+User = get_user_model()
+
+
+def get_max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    help = ('Opens many idle notification websockets against the ASGI application in this process, '
+            'then reports memory per connection and how long one push takes to reach all of them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True, help='User the connections authenticate as.')
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=500, help='Connections opened concurrently.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError('User not found')
+
+        token = str(AccessToken.for_user(user))
+        async_to_sync(self.run)(user.id, token, options['connections'], options['batch_size'])
+
+    async def run(self, user_id, token: str, connections: int, batch_size: int):
+        from kemea.asgi import application
+
+        rss_before = get_max_rss_kb()
+        started = time.perf_counter()
+
+        communicators = []
+        for start in range(0, connections, batch_size):
+            batch = [
+                WebsocketCommunicator(application, f'/ws/notifications?token={token}')
+                for _ in range(min(batch_size, connections - start))
+            ]
+            results = await asyncio.gather(*(communicator.connect(timeout=60) for communicator in batch))
+            communicators += [communicator for communicator, (connected, _) in zip(batch, results) if connected]
+
+        connect_time = time.perf_counter() - started
+        rss_after = get_max_rss_kb()
+        self.stdout.write(f'Connected {len(communicators)}/{connections} in {connect_time:.2f}s')
+        self.stdout.write(f'Memory: {(rss_after - rss_before) / 1024:.1f} MB for the connections, '
+                          f'~{(rss_after - rss_before) / max(len(communicators), 1):.1f} KB each, '
+                          f'{rss_after / 1024:.1f} MB process peak')
+
+        started = time.perf_counter()
+        await get_channel_layer().group_send(
+            get_notification_group(user_id), {'type': 'notification.message', 'notification': {'title': 'Load test'}}
+        )
+        await asyncio.gather(*(communicator.receive_json_from(timeout=30) for communicator in communicators))
+        self.stdout.write(f'One push reached every connection in {time.perf_counter() - started:.2f}s')
+
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_alter_notification_notification_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('CONTACT_REQUEST', 'Contact request'), ('AD_APPROVED', 'Ad approved'), ('AD_REJECTED', 'Ad rejected'), ('AD_TERMINATED', 'Ad terminated'), ('SAVED_SEARCH_MATCH', 'Saved search match'), ('PRICE_DROP', 'Price drop')], max_length=50),
+        ),
+    ]
@@ -1,3 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+from apps.common.models import BaseModel
+from apps.notification.choices import EMAIL_STATUS, PENDING, NOTIFICATION_TYPES
+
+User = get_user_model()
+
 
 # Create your models here.
+
+
+class EmailOutbox(BaseModel):
+    subject = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=EMAIL_STATUS, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name_plural = 'Email Outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
+class Notification(BaseModel):
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True, default='')
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['recipient', '-created'], name='notification_recipient_idx'),
+            models.Index(fields=['recipient', 'read'], name='notification_unread_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class NotificationCounter(BaseModel):
+    # Kept in step with the recipient's unread notifications so reading the count never has to count rows
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.unread}"
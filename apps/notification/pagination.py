@@ -0,0 +1,10 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class NotificationCursorPagination(CursorPagination):
+    # Keyset pagination on the recipient index, pages stay cheap however far back the user scrolls
+    ordering = '-created'
+    page_size = settings.NOTIFICATION_PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = 'page_size'
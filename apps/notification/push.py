@@ -0,0 +1,36 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.notification.consumers import get_notification_group
+from apps.notification.serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+
+async def _group_send_all(channel_layer, messages: list) -> None:
+    for group, message in messages:
+        await channel_layer.group_send(group, message)
+
+
+def push_notifications(notifications: list) -> None:
+    """
+    Send new notifications to the open websocket sessions of their recipients.
+
+    Delivery is best effort, the notification is already stored and shows up in the list either way.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not notifications:
+        return
+
+    messages = [
+        (get_notification_group(notification.recipient_id),
+         {'type': 'notification.message', 'notification': NotificationSerializer(notification).data})
+        for notification in notifications
+    ]
+    try:
+        # One event loop hop for the whole batch rather than one per recipient
+        async_to_sync(_group_send_all)(channel_layer, messages)
+    except Exception:
+        logger.exception("Failed to push %s notifications", len(messages))
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.notification.choices import CONTACT_REQUEST, AD_APPROVED, AD_REJECTED, AD_TERMINATED
+from apps.notification.models import Notification, NotificationCounter
+from apps.notification.push import push_notifications
+
+User = get_user_model()
+
+
+def notify_users(recipient_ids, notification_type: str, title: str, message: str = '', data: dict = None) -> int:
+    """
+    Send the same notification to every recipient and return how many were notified.
+
+    Rows are inserted in batches of NOTIFICATION_BATCH_SIZE, each batch raising the unread
+    counters of its recipients with a single UPDATE. Connected sessions get the notification
+    pushed once the transaction commits.
+    """
+    recipient_ids = list(dict.fromkeys(recipient_ids))
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
+
+    for start in range(0, len(recipient_ids), batch_size):
+        batch_ids = recipient_ids[start:start + batch_size]
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create([
+                Notification(recipient_id=recipient_id, notification_type=notification_type, title=title,
+                             message=message, data=data or {})
+                for recipient_id in batch_ids
+            ])
+            _increment_unread_counts(batch_ids)
+            transaction.on_commit(lambda batch=notifications: push_notifications(batch))
+    return len(recipient_ids)
+
+
+def _increment_unread_counts(user_ids: list) -> None:
+    NotificationCounter.objects.bulk_create([NotificationCounter(user_id=user_id) for user_id in user_ids],
+                                            ignore_conflicts=True)
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=F('unread') + 1)
+
+
+def _decrement_unread_count(user: User, amount: int) -> None:
+    if amount:
+        NotificationCounter.objects.filter(user=user).update(unread=Greatest(F('unread') - amount, 0))
+
+
+def get_user_notifications(user: User) -> QuerySet[Notification]:
+    return Notification.objects.filter(recipient=user).order_by('-created')
+
+
+def get_unread_count(user: User) -> int:
+    return NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+
+
+@transaction.atomic
+def mark_notifications_read(user: User, notification_ids: list) -> int:
+    # Only rows that were still unread are counted, so marking the same notification twice is harmless
+    updated = Notification.objects.filter(recipient=user, id__in=notification_ids, read=False) \
+        .update(read=True, read_at=timezone.now())
+    _decrement_unread_count(user, updated)
+    return updated
+
+
+@transaction.atomic
+def mark_all_notifications_read(user: User) -> int:
+    updated = Notification.objects.filter(recipient=user, read=False).update(read=True, read_at=timezone.now())
+    _decrement_unread_count(user, updated)
+    return updated
+
+
+"""
+PRODUCERS
+"""
+
+
+def notify_contact_request(contact) -> None:
+    notify_users(
+        [contact.company_id],
+        CONTACT_REQUEST,
+        title="New contact request",
+        message=f"{contact.name} wants to get in touch about {contact.property.name}",
+        data={"property_id": str(contact.property_id), "contact_id": str(contact.id)},
+    )
+
+
+AD_STATUS_NOTIFICATIONS = {
+    AD_APPROVED: ("Ad approved", "Your ad {name} has been approved and is now live"),
+    AD_REJECTED: ("Ad rejected", "Your ad {name} has been rejected"),
+    AD_TERMINATED: ("Ad terminated", "Your ad {name} has been terminated"),
+}
+
+
+def notify_property_ad_status(property_ad, notification_type: str) -> None:
+    if not property_ad.lister_id:
+        return
+
+    title, message = AD_STATUS_NOTIFICATIONS[notification_type]
+    notify_users([property_ad.lister_id], notification_type, title=title,
+                 message=message.format(name=property_ad.name), data={"property_id": str(property_ad.id)})
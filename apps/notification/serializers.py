@@ -0,0 +1,15 @@
+from rest_framework import serializers as sr
+
+
+class NotificationSerializer(sr.Serializer):
+    id = sr.UUIDField(read_only=True)
+    notification_type = sr.CharField(read_only=True)
+    title = sr.CharField(read_only=True)
+    message = sr.CharField(read_only=True)
+    data = sr.JSONField(read_only=True)
+    read = sr.BooleanField(read_only=True)
+    created = sr.DateTimeField(read_only=True)
+
+
+class MarkNotificationsReadSerializer(sr.Serializer):
+    ids = sr.ListField(child=sr.UUIDField(), allow_empty=False, max_length=100)
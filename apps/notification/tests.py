@@ -0,0 +1,180 @@
+import socketserver
+import threading
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.notification.choices import PENDING, SENDING, SENT, FAILED
+from apps.notification.models import EmailOutbox
+from utilities.emails import EmailSender
+
+
+# Create your tests here.
+
+
+class SMTPStandIn:
+    """
+    Local stand-in for an SMTP server, recording the connections it accepts and the messages it receives.
+
+    Recipients in `rejected` are refused, which makes sending to them fail.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        self.rejected = set()
+        self._lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f'{line}\r\n'.encode())
+
+            def handle(self):
+                with stand_in._lock:
+                    stand_in.connections += 1
+                self.reply('220 localhost SMTP stand-in')
+                recipients = []
+                while line := self.rfile.readline():
+                    command = line.decode().strip()
+                    verb = command.split(' ', 1)[0].upper()
+                    if verb in ('EHLO', 'HELO'):
+                        self.reply('250 localhost')
+                    elif verb == 'MAIL':
+                        recipients = []
+                        self.reply('250 OK')
+                    elif verb == 'RCPT':
+                        address = command.split(':', 1)[1].strip().strip('<>')
+                        if address in stand_in.rejected:
+                            self.reply('550 No such user')
+                        else:
+                            recipients.append(address)
+                            self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b''):
+                            pass
+                        with stand_in._lock:
+                            stand_in.messages.append(recipients)
+                        self.reply('250 OK')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        # RSET, NOOP and anything else
+                        self.reply('250 OK')
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class EmailSenderTestCase(TestCase):
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        self.smtp.start()
+        self.addCleanup(self.smtp.stop)
+
+        settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.smtp.port, EMAIL_USE_SSL=False, EMAIL_USE_TLS=False, EMAIL_HOST_USER='noreply@kemea.com',
+            EMAIL_HOST_PASSWORD='', EMAIL_OUTBOX_BATCH_SIZE=20, EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+            EMAIL_OUTBOX_RETRY_DELAY=30,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.sender = EmailSender(workers=1)
+
+    @staticmethod
+    def queue_email(recipient: str) -> EmailOutbox:
+        return EmailOutbox.objects.create(subject='Hello', recipients=[recipient], body='Hello',
+                                          html_body='<p>Hello</p>')
+
+    def make_due(self, message: EmailOutbox):
+        EmailOutbox.objects.filter(id=message.id).update(next_attempt_at=timezone.now())
+
+    def test_batch_is_sent_over_one_connection(self):
+        messages = [self.queue_email(f'user{index}@kemea.com') for index in range(3)]
+
+        self.assertEqual(self.sender.send_due_batch(), 3)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(len(self.smtp.messages), 3)
+        for message in messages:
+            message.refresh_from_db()
+            self.assertEqual(message.status, SENT)
+            self.assertIsNotNone(message.sent_at)
+
+        # Nothing is due anymore
+        self.assertEqual(self.sender.send_due_batch(), 0)
+
+    def test_batches_are_limited_to_the_batch_size(self):
+        for index in range(3):
+            self.queue_email(f'user{index}@kemea.com')
+
+        sender = EmailSender(workers=1, batch_size=2)
+        self.assertEqual(sender.send_due_batch(), 2)
+        self.assertEqual(sender.send_due_batch(), 1)
+        self.assertEqual(len(self.smtp.messages), 3)
+
+    def test_failed_email_is_retried_with_backoff(self):
+        self.smtp.rejected.add('missing@kemea.com')
+        failing = self.queue_email('missing@kemea.com')
+        delivered = self.queue_email('user@kemea.com')
+
+        started = timezone.now()
+        self.sender.send_due_batch()
+        failing.refresh_from_db()
+        delivered.refresh_from_db()
+
+        # One failure doesn't hold back the rest of the batch
+        self.assertEqual(delivered.status, SENT)
+        self.assertEqual(failing.status, PENDING)
+        self.assertEqual(failing.attempts, 1)
+        self.assertIn('missing@kemea.com', failing.last_error)
+        self.assertAlmostEqual((failing.next_attempt_at - started).total_seconds(), 30, delta=5)
+
+        # Not due yet, so the next batch leaves it alone
+        self.assertEqual(self.sender.send_due_batch(), 0)
+
+        self.make_due(failing)
+        started = timezone.now()
+        self.sender.send_due_batch()
+        failing.refresh_from_db()
+        self.assertEqual(failing.attempts, 2)
+        self.assertAlmostEqual((failing.next_attempt_at - started).total_seconds(), 60, delta=5)
+
+    def test_email_fails_after_max_attempts(self):
+        self.smtp.rejected.add('missing@kemea.com')
+        failing = self.queue_email('missing@kemea.com')
+
+        for _ in range(3):
+            self.make_due(failing)
+            self.sender.send_due_batch()
+        failing.refresh_from_db()
+
+        self.assertEqual(failing.status, FAILED)
+        self.assertEqual(failing.attempts, 3)
+
+        self.make_due(failing)
+        self.assertEqual(self.sender.send_due_batch(), 0)
+
+    def test_messages_left_sending_by_a_dead_process_are_sent_again(self):
+        message = self.queue_email('user@kemea.com')
+        EmailOutbox.objects.filter(id=message.id).update(
+            status=SENDING, claimed_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(self.sender.send_due_batch(), 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, SENT)
@@ -1,5 +1,10 @@
 from django.urls import path
 
-urlpatterns = [
+from apps.notification.views import *
 
+urlpatterns = [
+    path('list', RetrieveNotificationsView.as_view(), name='notifications'),
+    path('unread/count', RetrieveUnreadNotificationCountView.as_view(), name='unread-notification-count'),
+    path('read', MarkNotificationsReadView.as_view(), name='mark-notifications-read'),
+    path('read/all', MarkAllNotificationsReadView.as_view(), name='mark-all-notifications-read'),
 ]
@@ -1,3 +1,180 @@
-from django.shortcuts import render
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from apps.common.responses import CustomResponse
+from apps.notification.pagination import NotificationCursorPagination
+from apps.notification.selectors import get_user_notifications, get_unread_count, mark_notifications_read, \
+    mark_all_notifications_read
+from apps.notification.serializers import NotificationSerializer, MarkNotificationsReadSerializer
+
 
 # Create your views here.
+
+
+class RetrieveNotificationsView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+
+    @extend_schema(
+        summary="Retrieve notifications",
+        description=
+        """
+        This endpoint retrieves the authenticated user's notifications, newest first.
+        Pass the cursor from `next` or `previous` to move between pages.
+        """,
+        parameters=[
+            OpenApiParameter(name='cursor', description='Page cursor', type=OpenApiTypes.STR),
+            OpenApiParameter(name='page_size', description='Notifications per page, at most 100',
+                             type=OpenApiTypes.INT),
+        ],
+        tags=['Notifications'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response={'application/json'},
+                description='Retrieved successfully',
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Retrieved successfully",
+                            "data": {
+                                "unread_count": 1,
+                                "next": "http://localhost:8000/api/v1/notification/list?cursor=cD0yMDIz",
+                                "previous": None,
+                                "results": [
+                                    {
+                                        "id": "0a6a3b4c-0d8e-4b53-93a5-5a1f4f3f1b11",
+                                        "notification_type": "AD_APPROVED",
+                                        "title": "Ad approved",
+                                        "message": "Your ad Sea view apartment has been approved and is now live",
+                                        "data": {"property_id": "d5a0d2ef-6c41-4ab4-9f0c-3c71f1c0cf3e"},
+                                        "read": False,
+                                        "created": "2023-10-12T09:41:17.012345Z"
+                                    }
+                                ]
+                            }
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def get(self, request):
+        paginator = self.pagination_class()
+        notifications = paginator.paginate_queryset(get_user_notifications(request.user), request, view=self)
+
+        data = {
+            "unread_count": get_unread_count(request.user),
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": self.serializer_class(notifications, many=True).data,
+        }
+        return CustomResponse.success(message="Retrieved successfully", data=data)
+
+
+class RetrieveUnreadNotificationCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Retrieve unread notification count",
+        description=
+        """
+        This endpoint retrieves how many of the authenticated user's notifications are unread
+        """,
+        tags=['Notifications'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response={'application/json'},
+                description='Retrieved successfully',
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Retrieved successfully",
+                            "data": {"unread_count": 3}
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def get(self, request):
+        return CustomResponse.success(message="Retrieved successfully",
+                                      data={"unread_count": get_unread_count(request.user)})
+
+
+class MarkNotificationsReadView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = MarkNotificationsReadSerializer
+
+    @extend_schema(
+        summary="Mark notifications as read",
+        description=
+        """
+        This endpoint marks the given notifications of the authenticated user as read
+        """,
+        tags=['Notifications'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response={'application/json'},
+                description='Marked as read',
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Marked as read",
+                            "data": {"marked": 2, "unread_count": 1}
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        marked = mark_notifications_read(request.user, serializer.validated_data['ids'])
+        return CustomResponse.success(message="Marked as read",
+                                      data={"marked": marked, "unread_count": get_unread_count(request.user)})
+
+
+class MarkAllNotificationsReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Mark all notifications as read",
+        description=
+        """
+        This endpoint marks every unread notification of the authenticated user as read
+        """,
+        request=None,
+        tags=['Notifications'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response={'application/json'},
+                description='Marked all as read',
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Marked all as read",
+                            "data": {"marked": 3, "unread_count": 0}
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def post(self, request):
+        marked = mark_all_notifications_read(request.user)
+        return CustomResponse.success(message="Marked all as read",
+                                      data={"marked": marked, "unread_count": get_unread_count(request.user)})
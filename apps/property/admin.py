@@ -71,3 +71,45 @@ class PropertyAdmin(admin.ModelAdmin):
         'ad_status'
         'price',
     )
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'ad_category', 'property_type', 'city', 'price_min', 'price_max')
+    list_per_page = 20
+    search_fields = ('name', 'user__email', 'city')
+    raw_id_fields = ('user',)
+    readonly_fields = ('bucket_key',)
+
+
+class PromoteAdMatchInline(admin.TabularInline):
+    model = PromoteAdMatch
+    extra = 0
+    can_delete = False
+    fields = ('rank', 'property', 'score')
+    readonly_fields = ('rank', 'property', 'score')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('property')
+
+
+@admin.register(PromoteAdRequest)
+class PromoteAdRequestAdmin(admin.ModelAdmin):
+    inlines = [PromoteAdMatchInline]
+    list_display = (
+        'first_name',
+        'last_name',
+        'location',
+        'property_type',
+        'desired_price',
+        'buy_or_rent',
+        'sell',
+        'closed',
+        'created',
+    )
+    list_filter = ('buy_or_rent', 'sell', 'closed')
+    list_per_page = 20
+    search_fields = ('first_name', 'last_name', 'email_address', 'location', 'property_type')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PropertyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.property'
+
+    def ready(self):
+        from apps.property import signals  # noqa: F401
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.choices import QUEUED
+from apps.common.jobs import job, finish_current_job, on_worker_start
+from apps.common.models import Job
+from apps.notification.choices import SAVED_SEARCH_MATCH, PRICE_DROP
+from apps.notification.selectors import notify_users
+from apps.property.choices import APPROVED
+from apps.property.leads import match_promote_ad_requests_to_listings
+from apps.property.media import cleanup_expired_media_uploads
+from apps.property.models import Property, SavedSearchMatch, FavoriteProperty
+from apps.property.searches import record_saved_search_matches
+from utilities.emails import send_email
+
+User = get_user_model()
+
+
+@job('property.match_saved_searches')
+def match_saved_searches(property_id: str):
+    try:
+        property_ad = Property.objects.get(id=property_id, ad_status=APPROVED, terminated=False)
+    except Property.DoesNotExist:
+        return
+
+    # Matches are collected per user and sent together after a delay instead of one alert per ad
+    run_at = timezone.now() + timedelta(seconds=settings.SAVED_SEARCH_DIGEST_DELAY)
+    for user_id in record_saved_search_matches(property_ad):
+        send_saved_search_digest.enqueue(user_id=user_id, run_at=run_at, key=f'saved-search-digest:{user_id}')
+
+
+@job('property.send_saved_search_digest')
+def send_saved_search_digest(user_id: str):
+    matches = list(
+        SavedSearchMatch.objects.filter(saved_search__user_id=user_id, notified_at__isnull=True)
+        .select_related('saved_search', 'property').order_by('created')
+    )
+    if not matches:
+        return
+
+    # One entry per ad, however many of the user's searches it matched
+    listings = {}
+    for match in matches:
+        property_ad = match.property
+        if property_ad.ad_status != APPROVED or property_ad.terminated:
+            continue
+        listing = listings.setdefault(str(property_ad.id), {
+            'name': property_ad.name, 'city': property_ad.city, 'price': property_ad.price,
+            'searches': [],
+        })
+        if match.saved_search.name:
+            listing['searches'].append(match.saved_search.name)
+
+    with transaction.atomic():
+        if listings:
+            user = User.objects.get(id=user_id)
+            send_email(
+                'New listings for your saved searches', [user.email], template='saved_search_digest.html',
+                context={'email': user.email, 'listings': list(listings.values())},
+            )
+            message = "1 new listing matches" if len(listings) == 1 else f"{len(listings)} new listings match"
+            notify_users([user_id], SAVED_SEARCH_MATCH, title="New listings for your saved searches",
+                         message=f"{message} your saved searches", data={"property_ids": list(listings)})
+        SavedSearchMatch.objects.filter(id__in=[match.id for match in matches]).update(notified_at=timezone.now())
+
+
+@job('property.notify_price_drop')
+def notify_price_drop(property_id: str, old_price: str, after_id: str = None):
+    """
+    Notify one chunk of the users who favorited an ad that its price dropped, then queue the next chunk.
+
+    Each chunk, the job for the next one and this job's success commit together, so a job that already
+    notified its chunk is never run again.
+    """
+    try:
+        property_ad = Property.objects.get(id=property_id, ad_status=APPROVED, terminated=False)
+    except Property.DoesNotExist:
+        return
+
+    old_price, new_price = Decimal(old_price), property_ad.get_effective_price()
+    if new_price >= old_price:
+        return
+
+    followers = FavoriteProperty.objects.filter(property_id=property_id).order_by('id')
+    if after_id:
+        followers = followers.filter(id__gt=after_id)
+    chunk = list(followers.values_list('id', 'user_id')[:settings.PRICE_DROP_CHUNK_SIZE])
+    if not chunk:
+        return
+
+    with transaction.atomic():
+        notify_users(
+            [user_id for _, user_id in chunk], PRICE_DROP, title="Price drop on a favorite",
+            message=f"{property_ad.name} dropped from {old_price} to {new_price}",
+            data={"property_id": str(property_ad.id), "old_price": str(old_price), "new_price": str(new_price)},
+        )
+        if len(chunk) == settings.PRICE_DROP_CHUNK_SIZE:
+            notify_price_drop.enqueue(property_id=property_id, old_price=str(old_price), after_id=str(chunk[-1][0]))
+        finish_current_job()
+
+
+# Only one matching run is ever waiting, whoever schedules it
+PROMOTE_MATCH_JOB_KEY = 'promote-ad-matching'
+
+
+@job('property.match_promote_ad_requests')
+def match_promote_ad_requests():
+    try:
+        match_promote_ad_requests_to_listings()
+    finally:
+        # Also after a failed run, so one bad run never ends the periodic matching
+        match_promote_ad_requests.enqueue(run_at=timezone.now() + timedelta(seconds=settings.PROMOTE_MATCH_INTERVAL),
+                                          key=PROMOTE_MATCH_JOB_KEY)
+
+
+@on_worker_start
+def start_promote_ad_matching():
+    # Starts the periodic matching on deploy, a run that is already waiting is left as it is
+    match_promote_ad_requests.enqueue(key=PROMOTE_MATCH_JOB_KEY)
+
+
+def schedule_promote_ad_matching() -> Job:
+    """
+    Make sure a matching run starts within PROMOTE_MATCH_NEW_REQUEST_DELAY seconds, for a new lead.
+
+    A run that is already waiting for later is moved up instead of the lead waiting a whole interval. The delay
+    lets the leads that arrive meanwhile share one run.
+    """
+    run_at = timezone.now() + timedelta(seconds=settings.PROMOTE_MATCH_NEW_REQUEST_DELAY)
+    queued_job = match_promote_ad_requests.enqueue(run_at=run_at, key=PROMOTE_MATCH_JOB_KEY)
+    if queued_job.run_at > run_at:
+        Job.objects.filter(id=queued_job.id, status=QUEUED, run_at__gt=run_at).update(run_at=run_at)
+    return queued_job
+
+
+# Only one cleanup is ever waiting, however many uploads are started
+CLEANUP_MEDIA_UPLOADS_JOB_KEY = 'cleanup-media-uploads'
+
+
+@job('property.cleanup_media_uploads')
+def cleanup_media_uploads():
+    cleanup_expired_media_uploads()
+
+
+def schedule_media_upload_cleanup():
+    # Late enough that a session started now has expired by the time it runs
+    return cleanup_media_uploads.enqueue(run_at=timezone.now() + timedelta(seconds=settings.MEDIA_UPLOAD_EXPIRY),
+                                         key=CLEANUP_MEDIA_UPLOADS_JOB_KEY)
@@ -0,0 +1,154 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+
+from apps.property.choices import APPROVED
+from apps.property.models import Property, PromoteAdRequest, PromoteAdMatch
+from apps.property.searches import normalize_term
+
+# How much each relative difference from what the lead asked for counts against a listing
+PRICE_WEIGHT = 0.5
+SURFACE_WEIGHT = 0.3
+ROOMS_WEIGHT = 0.2
+
+
+def add_relative_distance(distance: np.ndarray, values: np.ndarray, desired: np.ndarray, weight: float) -> None:
+    # Adds weight * |value - desired| / desired to the requests x listings matrix, nothing where desired is unset
+    desired = desired[:, None]
+    scale = np.divide(weight, desired, out=np.zeros_like(desired), where=desired > 0)
+    difference = np.subtract(values[None, :], desired)
+    np.abs(difference, out=difference)
+    difference *= scale
+    distance += difference
+
+
+def score_listings(prices: np.ndarray, surfaces: np.ndarray, rooms: np.ndarray, desired_prices: np.ndarray,
+                   desired_surfaces: np.ndarray, desired_rooms: np.ndarray) -> np.ndarray:
+    """
+    Score every listing of a bucket for every request of it at once, as a requests x listings matrix.
+
+    Scores run from 1 for an exact match towards 0, listings too far over the lead's budget score -inf.
+    Work happens in place on float32 matrices, the chunk size bounds how large they get.
+    """
+    distance = np.zeros((len(desired_prices), len(prices)), dtype=np.float32)
+    add_relative_distance(distance, prices, desired_prices, PRICE_WEIGHT)
+    add_relative_distance(distance, surfaces, desired_surfaces, SURFACE_WEIGHT)
+    add_relative_distance(distance, rooms, desired_rooms, ROOMS_WEIGHT)
+    distance += 1
+    scores = np.reciprocal(distance, out=distance)
+
+    budgets = desired_prices * np.float32(1 + settings.PROMOTE_MATCH_PRICE_TOLERANCE)
+    np.putmask(scores, prices[None, :] > budgets[:, None], -np.inf)
+    return scores
+
+
+def get_top_matches(scores: np.ndarray, top_n: int) -> tuple:
+    # Column indices of the best scores of each row, best first, and the scores themselves
+    if scores.shape[1] > top_n:
+        top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def rank_bucket(listings: dict, requests: dict, top_n: int):
+    """
+    Yield (request index, listing index, score, rank) for the top matches of each request in a bucket.
+
+    Requests are scored in chunks so the score matrix stays under PROMOTE_MATCH_MAX_CELLS.
+    """
+    chunk_size = max(settings.PROMOTE_MATCH_MAX_CELLS // len(listings['price']), 1)
+    for start in range(0, len(requests['price']), chunk_size):
+        end = start + chunk_size
+        scores = score_listings(
+            listings['price'], listings['surface'], listings['rooms'],
+            requests['price'][start:end], requests['surface'][start:end], requests['rooms'][start:end],
+        )
+        top, top_scores = get_top_matches(scores, top_n)
+        for row in range(top.shape[0]):
+            for rank, (column, score) in enumerate(zip(top[row], top_scores[row]), start=1):
+                if score == -np.inf:
+                    break
+                yield start + row, int(column), float(score), rank
+
+
+def _collect_buckets(rows) -> dict:
+    # (city, property type) -> ids and float32 columns of price, surface and rooms
+    buckets = defaultdict(lambda: {'ids': [], 'price': [], 'surface': [], 'rooms': []})
+    for row_id, location, property_type, price, surface, rooms in rows:
+        bucket = buckets[normalize_term(location), normalize_term(property_type)]
+        bucket['ids'].append(row_id)
+        bucket['price'].append(price)
+        bucket['surface'].append(surface)
+        bucket['rooms'].append(rooms)
+
+    for bucket in buckets.values():
+        for column in ('price', 'surface', 'rooms'):
+            bucket[column] = np.array(bucket[column], dtype=np.float32)
+    return buckets
+
+
+def get_open_promote_ad_requests() -> QuerySet[PromoteAdRequest]:
+    # Sell requests are owners looking for an agent, not leads for existing listings
+    return PromoteAdRequest.objects.filter(buy_or_rent=True, closed=False)
+
+
+def match_promote_ad_requests_to_listings(top_n: int = None) -> int:
+    """
+    Replace the stored matches of every open buy or rent request with its best approved listings.
+
+    Listings and requests are grouped by city and property type, then each group is scored in NumPy,
+    so the cost is a few array operations per group instead of a query or a Python loop per pair.
+    Returns the number of requests whose matches changed.
+    """
+    top_n = top_n or settings.PROMOTE_MATCH_TOP_N
+
+    listing_rows = Property.objects.filter(ad_status=APPROVED, terminated=False).values_list(
+        'id', 'city', 'property_type__name', 'price', 'discount', 'total_surface', 'number_of_rooms'
+    )
+    listings = _collect_buckets(
+        # Matched on what a buyer actually pays
+        (row_id, city, property_type, float(price) * (1 - discount / 100), surface, rooms)
+        for row_id, city, property_type, price, discount, surface, rooms in listing_rows.iterator(chunk_size=5000)
+    )
+    requests = _collect_buckets(get_open_promote_ad_requests().values_list(
+        'id', 'location', 'property_type', 'desired_price', 'surface', 'rooms'
+    ).iterator(chunk_size=5000))
+
+    matches = defaultdict(list)
+    for bucket_key, bucket_requests in requests.items():
+        bucket_listings = listings.get(bucket_key)
+        if not bucket_listings:
+            continue
+        for request_index, listing_index, score, rank in rank_bucket(bucket_listings, bucket_requests, top_n):
+            matches[bucket_requests['ids'][request_index]].append(
+                (bucket_listings['ids'][listing_index], rank, round(score, 4))
+            )
+
+    # Between runs most requests keep the same matches, only the ones that changed are rewritten
+    stored = defaultdict(list)
+    stored_rows = PromoteAdMatch.objects.filter(request__in=get_open_promote_ad_requests()) \
+        .values_list('request_id', 'property_id', 'rank', 'score').order_by('request_id', 'rank')
+    for request_id, property_id, rank, score in stored_rows.iterator(chunk_size=5000):
+        stored[request_id].append((property_id, rank, score))
+    changed = [request_id for request_id in stored.keys() | matches.keys() if stored[request_id] != matches[request_id]]
+
+    with transaction.atomic():
+        for start in range(0, len(changed), 1000):
+            PromoteAdMatch.objects.filter(request_id__in=changed[start:start + 1000]).delete()
+        PromoteAdMatch.objects.bulk_create([
+            PromoteAdMatch(request_id=request_id, property_id=property_id, rank=rank, score=score)
+            for request_id in changed for property_id, rank, score in matches[request_id]
+        ], batch_size=1000)
+    return len(changed)
+
+
+def get_agent_promote_ad_matches(user) -> QuerySet[PromoteAdMatch]:
+    # Open leads that match the agent's own listings, best first
+    return PromoteAdMatch.objects.filter(property__lister=user, request__closed=False) \
+        .select_related('request', 'property').order_by('-score', 'rank')
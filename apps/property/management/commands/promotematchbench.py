@@ -0,0 +1,46 @@
+import resource
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.property.leads import rank_bucket
+
+
+class Command(BaseCommand):
+    help = ('Scores synthetic promote ad requests against synthetic listings with the same code as the matching '
+            'job, without touching the database, and reports how long the scoring takes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000)
+        parser.add_argument('--requests', type=int, default=10_000)
+        parser.add_argument('--buckets', type=int, default=50, help='Distinct city and property type pairs.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        listing_buckets = rng.integers(options['buckets'], size=options['listings'])
+        request_buckets = rng.integers(options['buckets'], size=options['requests'])
+
+        def make_columns(size: int) -> dict:
+            return {
+                'price': rng.uniform(50_000, 1_000_000, size).astype(np.float32),
+                'surface': rng.integers(0, 400, size).astype(np.float32),
+                'rooms': rng.integers(0, 8, size).astype(np.float32),
+            }
+
+        listings, requests = make_columns(options['listings']), make_columns(options['requests'])
+        started = time.perf_counter()
+        matches = 0
+        for bucket in range(options['buckets']):
+            bucket_listings = {column: values[listing_buckets == bucket] for column, values in listings.items()}
+            bucket_requests = {column: values[request_buckets == bucket] for column, values in requests.items()}
+            if not len(bucket_listings['price']) or not len(bucket_requests['price']):
+                continue
+            matches += sum(1 for _ in rank_bucket(bucket_listings, bucket_requests, settings.PROMOTE_MATCH_TOP_N))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Scored {options['requests']} requests against {options['listings']} listings "
+                          f"in {options['buckets']} buckets in {elapsed:.2f}s, {matches} matches kept")
+        self.stdout.write(f"Process peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
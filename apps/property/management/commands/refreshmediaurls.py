@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.property.models import PropertyMedia
+from utilities.storage import get_media_url_version
+
+
+class Command(BaseCommand):
+    help = 'Re-resolves stored property media URLs that were saved under another storage configuration.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Refresh every URL, not only stale ones.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = PropertyMedia.objects.only('id', 'media', 'media_url', 'media_url_version').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(~Q(media_url_version=get_media_url_version()) | Q(media_url=''))
+
+        refreshed = 0
+        last_id = None
+        while True:
+            batch = queryset.filter(id__gt=last_id) if last_id else queryset
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+
+            for media in batch:
+                media.refresh_url()
+            PropertyMedia.objects.bulk_update(batch, ['media_url', 'media_url_version'])
+
+            refreshed += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(f'Refreshed {refreshed} media URLs.')
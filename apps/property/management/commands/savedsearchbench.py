@@ -0,0 +1,121 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.property.choices import APPROVED
+from apps.property.models import AdCategory, PropertyType, Property, SavedSearch
+from apps.property.searches import find_matching_saved_searches, get_bucket_key, normalize_term
+
+User = get_user_model()
+
+# Rows created by the benchmark, removed again when it finishes
+BENCH_PREFIX = 'searchbench-'
+
+CITIES = ('Athens', 'Thessaloniki', 'Patras', 'Heraklion', 'Larissa', 'Volos', 'Ioannina', 'Chania')
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic saved searches and approved ads, then measures how long matching one ad takes '
+            'through the bucket index against scanning every saved search, and checks both find the same searches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--searches', type=int, default=100_000)
+        parser.add_argument('--ads', type=int, default=50)
+        parser.add_argument('--users', type=int, default=1000, help='Owners the saved searches are spread over.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        categories = [AdCategory.objects.get_or_create(name=f'{BENCH_PREFIX}{name}')[0] for name in ('sale', 'rent')]
+        property_types = [PropertyType.objects.get_or_create(name=f'{BENCH_PREFIX}type-{index}')[0]
+                          for index in range(5)]
+
+        try:
+            users = User.objects.bulk_create([
+                User(email=f'{BENCH_PREFIX}{index}@example.com') for index in range(options['users'])
+            ])
+            self.seed_searches(rng, users, categories, property_types, options['searches'], options['batch_size'])
+            ads = Property.objects.bulk_create([
+                Property(name=f'{BENCH_PREFIX}{index}', city=rng.choice(CITIES), street='Bench', area='Bench',
+                         description='Bench listing', ad_status=APPROVED, ad_category=rng.choice(categories),
+                         property_type=rng.choice(property_types), price=Decimal(rng.randrange(50_000, 1_000_000)),
+                         number_of_rooms=rng.randrange(1, 6), surface_build=rng.randrange(30, 300))
+                for index in range(options['ads'])
+            ])
+
+            indexed_time = scan_time = matches = 0
+            for property_ad in ads:
+                started = time.perf_counter()
+                indexed = {saved_search.id for saved_search in find_matching_saved_searches(property_ad)}
+                indexed_time += time.perf_counter() - started
+
+                started = time.perf_counter()
+                scanned = self.scan_saved_searches(property_ad)
+                scan_time += time.perf_counter() - started
+
+                if indexed != scanned:
+                    self.stderr.write(f'Matches differ for {property_ad.name}: {len(indexed)} indexed, '
+                                      f'{len(scanned)} scanned')
+                matches += len(indexed)
+
+            count = len(ads)
+            self.stdout.write(f"{options['searches']} saved searches, {count} ads, "
+                              f"{matches / count:.0f} matches per ad")
+            self.stdout.write(f'  indexed: {indexed_time / count * 1000:8.1f}ms per ad')
+            self.stdout.write(f'     scan: {scan_time / count * 1000:8.1f}ms per ad')
+        finally:
+            SavedSearch.objects.filter(user__email__startswith=BENCH_PREFIX).delete()
+            Property.objects.filter(name__startswith=BENCH_PREFIX).delete()
+            User.objects.filter(email__startswith=BENCH_PREFIX).delete()
+            AdCategory.objects.filter(name__startswith=BENCH_PREFIX).delete()
+            PropertyType.objects.filter(name__startswith=BENCH_PREFIX).delete()
+
+    def seed_searches(self, rng, users, categories, property_types, count: int, batch_size: int):
+        category_names = [category.name for category in categories]
+        type_names = [property_type.name for property_type in property_types]
+        for start in range(0, count, batch_size):
+            searches = []
+            for _ in range(min(batch_size, count - start)):
+                # About half of the searches leave each part open
+                ad_category = normalize_term(rng.choice([*category_names, *[''] * len(category_names)]))
+                property_type = normalize_term(rng.choice([*type_names, *[''] * len(type_names)]))
+                city = normalize_term(rng.choice([*CITIES, *[''] * len(CITIES)]))
+                price_min = Decimal(rng.randrange(0, 500_000)) if rng.random() < 0.5 else None
+                price_max = price_min + Decimal(rng.randrange(50_000, 500_000)) if price_min is not None else None
+                params = {'ad_category': ad_category, 'property_type': property_type, 'city': city,
+                          'price_min': None if price_min is None else str(price_min),
+                          'price_max': None if price_max is None else str(price_max)}
+                if rng.random() < 0.2:
+                    params['rooms'] = rng.randrange(1, 6)
+                searches.append(SavedSearch(
+                    user=rng.choice(users), params=params, ad_category=ad_category, property_type=property_type,
+                    city=city, bucket_key=get_bucket_key(ad_category, property_type, city),
+                    price_min=price_min, price_max=price_max,
+                ))
+            SavedSearch.objects.bulk_create(searches)
+
+    @staticmethod
+    def scan_saved_searches(property_ad: Property) -> set:
+        # Reads every saved search and checks each predicate in Python, what matching costs without the index
+        ad_terms = {
+            'ad_category': normalize_term(property_ad.ad_category.name),
+            'property_type': normalize_term(property_ad.property_type.name),
+            'city': normalize_term(property_ad.city),
+        }
+        feature_names = set(property_ad.features.values_list('name', flat=True))
+        matched = set()
+        for saved_search in SavedSearch.objects.iterator():
+            if any(getattr(saved_search, part) not in ('', term) for part, term in ad_terms.items()):
+                continue
+            if saved_search.price_min is not None and saved_search.price_min > property_ad.price:
+                continue
+            if saved_search.price_max is not None and saved_search.price_max < property_ad.price:
+                continue
+            if saved_search.user_id != property_ad.lister_id and \
+                    saved_search.matches_property(property_ad, feature_names):
+                matched.add(saved_search.id)
+        return matched
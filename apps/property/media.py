@@ -0,0 +1,309 @@
+import hashlib
+import os
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import UnreadablePostError
+from django.utils import timezone
+from rest_framework import status
+
+from apps.common.errors import ErrorCode
+from apps.common.exceptions import RequestError
+from apps.property.models import MediaBlob, PropertyMedia, Property, MediaUpload
+from utilities.storage import get_storage_uploader
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+MAX_PROPERTY_MEDIA = 30
+
+UPLOAD_CLEANUP_BATCH_SIZE = 1000
+
+# Passes at storing a batch of media before giving up, each one uploads what was deleted under it
+MEDIA_STORE_ATTEMPTS = 3
+
+
+def hash_media_file(media_file) -> str:
+    # Hash the file in chunks so large uploads are never read into memory at once
+    digest = hashlib.sha256()
+    for chunk in media_file.chunks(chunk_size=HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    media_file.seek(0)
+    return digest.hexdigest()
+
+
+def get_blob_key(content_hash: str, file_name: str) -> str:
+    extension = os.path.splitext(file_name or '')[1].lower()
+    return f"property_media/{content_hash[:2]}/{content_hash}{extension}"
+
+
+def _register_blob(content_hash: str, stored_name: str, size: int) -> MediaBlob:
+    try:
+        with transaction.atomic():
+            return MediaBlob.objects.create(content_hash=content_hash, file=stored_name, size=size)
+    except IntegrityError:
+        # Another request stored the same content first, keep theirs and drop our copy
+        default_storage.delete(stored_name)
+        return MediaBlob.objects.get(content_hash=content_hash)
+
+
+def _upload_new_blobs(files_by_hash: dict) -> dict:
+    results = get_storage_uploader().save_many([
+        (get_blob_key(content_hash, media_file.name), media_file)
+        for content_hash, media_file in files_by_hash.items()
+    ])
+
+    failed = {
+        media_file.name: str(result.error)
+        for media_file, result in zip(files_by_hash.values(), results) if not result.ok
+    }
+    if failed:
+        # Don't leave the files that did make it behind without a blob
+        for result in results:
+            if result.ok:
+                default_storage.delete(result.stored_name)
+        raise RequestError(err_code=ErrorCode.NETWORK_FAILURE, err_msg="Some media files could not be stored",
+                           status_code=status.HTTP_502_BAD_GATEWAY, data=failed)
+
+    return {
+        content_hash: _register_blob(content_hash, result.stored_name, media_file.size)
+        for (content_hash, media_file), result in zip(files_by_hash.items(), results)
+    }
+
+
+def store_media_files(media_files: list) -> list[MediaBlob]:
+    """
+    Store uploaded files under content-addressed keys and return one blob per file.
+
+    Files whose content already exists are not uploaded again; the existing blob is reused
+    and its reference count is raised once for every file that points at it. New content is
+    uploaded to the storage backend concurrently.
+
+    Reused blobs are locked before their count is raised, so a concurrent release can't delete
+    them in between. A blob that was deleted before it could be locked is uploaded again.
+    """
+    hashes = [hash_media_file(media_file) for media_file in media_files]
+    # Files with the same content are stored once
+    files_by_hash = dict(zip(hashes, media_files))
+
+    for _ in range(MEDIA_STORE_ATTEMPTS):
+        with transaction.atomic():
+            blobs_by_hash = MediaBlob.objects.select_for_update().in_bulk(set(hashes), field_name='content_hash')
+            missing = {content_hash: files_by_hash[content_hash]
+                       for content_hash in files_by_hash if content_hash not in blobs_by_hash}
+            if not missing:
+                references = Counter(blobs_by_hash[content_hash].id for content_hash in hashes)
+                if all(MediaBlob.objects.filter(id=blob_id).update(ref_count=F('ref_count') + count)
+                       for blob_id, count in references.items()):
+                    return [blobs_by_hash[content_hash] for content_hash in hashes]
+                # A blob is gone after all, undo the increments and look again
+                transaction.set_rollback(True)
+                continue
+
+        # Uploaded outside the lock, the next pass locks the new blobs with the reused ones
+        for media_file in missing.values():
+            media_file.seek(0)
+        _upload_new_blobs(missing)
+
+    raise RequestError(err_code=ErrorCode.SERVER_BUSY, err_msg="Media files could not be stored, please try again",
+                       status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def build_property_media(property_ad: Property, blobs: list[MediaBlob], start_position: int = 0) -> list[PropertyMedia]:
+    # Point the rows at the already stored blob, so saving them never uploads the file again
+    property_media = [
+        PropertyMedia(property=property_ad, media=blob.file.name, blob=blob, position=start_position + index)
+        for index, blob in enumerate(blobs)
+    ]
+
+    # Resolve each public URL once now instead of on every read
+    for media in property_media:
+        media.refresh_url()
+    return property_media
+
+
+def create_property_media(property_ad: Property, media_files: list, start_position: int = 0) -> list[PropertyMedia]:
+    blobs = store_media_files(media_files)
+    return PropertyMedia.objects.bulk_create(build_property_media(property_ad, blobs, start_position=start_position))
+
+
+def check_media_limit(media_count: int) -> None:
+    if media_count > MAX_PROPERTY_MEDIA:
+        raise RequestError(err_code=ErrorCode.NOT_ALLOWED,
+                           err_msg=f"A property ad can have at most {MAX_PROPERTY_MEDIA} media files",
+                           status_code=status.HTTP_400_BAD_REQUEST)
+
+
+def release_media_blobs(blob_ids: list) -> None:
+    """
+    Drop one reference per id and delete blobs nothing points at anymore.
+
+    Stored files are only removed once the surrounding transaction commits.
+    """
+    for blob_id, references in Counter(blob_ids).items():
+        MediaBlob.objects.filter(id=blob_id).update(ref_count=F('ref_count') - references)
+
+    with transaction.atomic():
+        unused_blobs = list(MediaBlob.objects.select_for_update().filter(id__in=set(blob_ids), ref_count__lte=0))
+        for blob in unused_blobs:
+            file_name = blob.file.name
+            blob.delete()
+            transaction.on_commit(lambda name=file_name: default_storage.delete(name))
+
+
+"""
+RESUMABLE UPLOADS
+"""
+
+
+def get_open_media_uploads(user):
+    # Sessions idle for longer than MEDIA_UPLOAD_EXPIRY are left for the cleanup job and no longer count
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_UPLOAD_EXPIRY)
+    return MediaUpload.objects.filter(user=user, updated__gte=cutoff)
+
+
+def create_media_upload(user, file_name: str, upload_length: int) -> MediaUpload:
+    if get_open_media_uploads(user).count() >= settings.MEDIA_UPLOAD_MAX_OPEN:
+        raise RequestError(err_code=ErrorCode.NOT_ALLOWED,
+                           err_msg=f"You can have at most {settings.MEDIA_UPLOAD_MAX_OPEN} uploads in progress",
+                           status_code=status.HTTP_400_BAD_REQUEST)
+
+    upload = MediaUpload.objects.create(user=user, file_name=file_name, upload_length=upload_length)
+
+    os.makedirs(settings.MEDIA_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(upload.temp_path, 'wb').close()
+    return upload
+
+
+def get_media_upload(user, upload_id: str) -> MediaUpload:
+    try:
+        return get_open_media_uploads(user).get(id=upload_id)
+    except MediaUpload.DoesNotExist:
+        raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Upload not found",
+                           status_code=status.HTTP_404_NOT_FOUND)
+
+
+def append_media_upload_chunk(user, upload_id: str, offset: int, stream, content_length: int) -> MediaUpload:
+    """
+    Write the request body at the given offset of an upload and record how far it got.
+
+    The offset must match what the server already has, like tus. If the connection drops
+    mid-chunk, the bytes received so far are kept so the client can resume from there.
+
+    The offset is claimed with a conditional UPDATE and the body is written outside any transaction,
+    so a slow client holds no row lock. A claim older than MEDIA_UPLOAD_CLAIM_TIMEOUT is taken over.
+    """
+    upload = get_media_upload(user, upload_id)
+
+    if offset != upload.offset:
+        raise RequestError(err_code=ErrorCode.INVALID_OFFSET,
+                           err_msg=f"Upload offset mismatch, expected {upload.offset}",
+                           status_code=status.HTTP_409_CONFLICT, data={"offset": upload.offset})
+
+    if upload.offset + content_length > upload.upload_length:
+        raise RequestError(err_code=ErrorCode.NOT_ALLOWED, err_msg="Chunk exceeds the upload length",
+                           status_code=status.HTTP_400_BAD_REQUEST)
+
+    claimed_at = timezone.now()
+    stale_claim = claimed_at - timedelta(seconds=settings.MEDIA_UPLOAD_CLAIM_TIMEOUT)
+    claimed = MediaUpload.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale_claim), id=upload.id, offset=offset
+    ).update(claimed_at=claimed_at, updated=claimed_at)
+    if not claimed:
+        raise RequestError(err_code=ErrorCode.INVALID_OFFSET,
+                           err_msg="Another chunk of this upload is in progress, check the offset and retry",
+                           status_code=status.HTTP_409_CONFLICT, data={"offset": upload.offset})
+
+    remaining = content_length
+    try:
+        with open(upload.temp_path, 'r+b') as temp_file:
+            temp_file.seek(offset)
+            try:
+                while remaining > 0 and stream is not None:
+                    chunk = stream.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    temp_file.write(chunk)
+                    remaining -= len(chunk)
+            except (UnreadablePostError, OSError):
+                pass
+            temp_file.truncate()
+    finally:
+        # Releases the claim whatever happened, with the offset covering what made it to disk
+        upload.offset = offset + content_length - remaining
+        upload.claimed_at = None
+        upload.updated = timezone.now()
+        MediaUpload.objects.filter(id=upload.id, claimed_at=claimed_at).update(
+            offset=upload.offset, claimed_at=None, updated=upload.updated
+        )
+    return upload
+
+
+def cleanup_expired_media_uploads() -> int:
+    """
+    Delete upload sessions idle for longer than MEDIA_UPLOAD_EXPIRY, with their temp files.
+
+    Returns how many sessions were removed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_UPLOAD_EXPIRY)
+    expired = MediaUpload.objects.filter(updated__lt=cutoff).order_by('id')
+
+    removed = 0
+    while True:
+        batch = list(expired.values_list('id', flat=True)[:UPLOAD_CLEANUP_BATCH_SIZE])
+        if not batch:
+            break
+        removed += MediaUpload.objects.filter(id__in=batch, updated__lt=cutoff).delete()[0]
+        # Sessions that received a chunk since they were listed are kept, with their files
+        kept = set(MediaUpload.objects.filter(id__in=batch).values_list('id', flat=True))
+        for upload_id in set(batch) - kept:
+            temp_path = os.path.join(settings.MEDIA_UPLOAD_TEMP_DIR, f"{upload_id}.part")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if len(batch) < UPLOAD_CLEANUP_BATCH_SIZE:
+            break
+    return removed
+
+
+def delete_media_upload(upload: MediaUpload) -> None:
+    temp_path = upload.temp_path
+    upload.delete()
+    transaction.on_commit(lambda: os.path.exists(temp_path) and os.remove(temp_path))
+
+
+def get_completed_uploads(user, upload_ids: list) -> list[MediaUpload]:
+    uploads = MediaUpload.objects.in_bulk(upload_ids)
+    if len(uploads) != len(set(upload_ids)) or any(upload.user_id != user.id for upload in uploads.values()):
+        raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Upload not found",
+                           status_code=status.HTTP_404_NOT_FOUND)
+
+    if not all(upload.is_complete for upload in uploads.values()):
+        raise RequestError(err_code=ErrorCode.NOT_ALLOWED, err_msg="Upload is not complete",
+                           status_code=status.HTTP_400_BAD_REQUEST)
+    return [uploads[upload_id] for upload_id in dict.fromkeys(upload_ids)]
+
+
+@contextmanager
+def open_completed_uploads(user, upload_ids: list):
+    """
+    Yield the assembled files of finished uploads so they can be stored like any other media file.
+
+    The upload sessions and their temp files are removed once the media has been created.
+    """
+    uploads = get_completed_uploads(user, upload_ids) if upload_ids else []
+    files = [File(open(upload.temp_path, 'rb'), name=upload.file_name) for upload in uploads]
+    try:
+        yield files
+    finally:
+        for upload_file in files:
+            upload_file.close()
+
+    for upload in uploads:
+        delete_media_upload(upload)
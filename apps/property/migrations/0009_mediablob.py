@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 22:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0009_unique_names_favorite_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated', models.DateTimeField(auto_now=True, null=True)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to='property_media')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-created',),
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='propertymedia',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='property_media', to='property.mediablob'),
+        ),
+    ]
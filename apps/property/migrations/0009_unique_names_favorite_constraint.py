@@ -0,0 +1,42 @@
+# Generated by Django 4.2.5 on 2026-10-18 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Model changes that were never migrated: unique lookup table names and the favorite constraint
+
+    dependencies = [
+        ('property', '0008_alter_adcategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='favoriteproperty',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='adcategory',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='propertyfeature',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='propertystate',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='propertytype',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='favoriteproperty',
+            constraint=models.UniqueConstraint(fields=('property', 'user'), name='unique_favorite_property'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 22:25
+
+from django.db import migrations, models
+
+
+def number_existing_media(apps, schema_editor):
+    PropertyMedia = apps.get_model('property', 'PropertyMedia')
+
+    positions = {}
+    media_to_update = []
+    for media in PropertyMedia.objects.order_by('property_id', 'created').only('id', 'property_id').iterator():
+        media.position = positions.get(media.property_id, 0)
+        positions[media.property_id] = media.position + 1
+        media_to_update.append(media)
+    PropertyMedia.objects.bulk_update(media_to_update, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0009_mediablob'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='propertymedia',
+            options={'ordering': ('position', 'created')},
+        ),
+        migrations.AddField(
+            model_name='propertymedia',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_media, migrations.RunPython.noop),
+    ]
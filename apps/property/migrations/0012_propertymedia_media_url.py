@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 22:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0011_mediaupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertymedia',
+            name='media_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='propertymedia',
+            name='media_url_version',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+    ]
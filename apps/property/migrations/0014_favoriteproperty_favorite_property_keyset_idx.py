@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0013_savedsearch_savedsearchmatch_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriteproperty',
+            index=models.Index(fields=['property', 'id'], name='favorite_property_keyset_idx'),
+        ),
+    ]
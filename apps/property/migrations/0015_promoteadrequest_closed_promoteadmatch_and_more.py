@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 23:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0014_favoriteproperty_favorite_property_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promoteadrequest',
+            name='closed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PromoteAdMatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated', models.DateTimeField(auto_now=True, null=True)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promote_ad_matches', to='property.property')),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='property.promoteadrequest')),
+            ],
+            options={
+                'verbose_name_plural': 'Promote Ad Matches',
+                'ordering': ('rank',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='promoteadmatch',
+            constraint=models.UniqueConstraint(fields=('request', 'property'), name='unique_promote_ad_match'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0015_promoteadrequest_closed_promoteadmatch_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaupload',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='Set while a chunk is being written', null=True),
+        ),
+    ]
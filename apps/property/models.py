@@ -1,6 +1,9 @@
+import os
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import UniqueConstraint
 
@@ -8,6 +11,7 @@ from apps.common.models import BaseModel
 from apps.core.validators import validate_phone_number
 from apps.property.choices import AD_STATUS, PENDING
 from apps.property.managers import PropertyManager, FavoritePropertyManager
+from utilities.storage import get_media_url_version
 
 User = get_user_model()
 
@@ -76,26 +80,88 @@ class Property(BaseModel):
 
     objects = PropertyManager()
 
+    # Changes to these fields are announced to the lister or to users following the ad, see apps.property.signals
+    TRACKED_FIELDS = ('ad_status', 'terminated', 'price', 'discount')
+
     class Meta:
         verbose_name_plural = 'Properties'
 
     def __str__(self):
         return self.name
 
+    def get_tracked_changes(self) -> dict:
+        # Old values of the tracked fields that changed since the ad was loaded or last saved, deferred ones are
+        # left out as their old value is unknown
+        changed = self.get_changed_fields()
+        return {field: changed[field] for field in self.TRACKED_FIELDS if changed.get(field) is not None}
+
     @property
     def discounted_price(self):
         return round(
             self.price - (self.price * Decimal((self.discount / 100))),
             2) if self.discount > 0 else 'No discounted price'
 
+    def get_effective_price(self, price: Decimal = None, discount: int = None) -> Decimal:
+        # What a buyer actually pays, optionally for another price and discount than the current ones
+        price = self.price if price is None else price
+        discount = self.discount if discount is None else discount
+        return round(price - (price * Decimal(discount / 100)), 2)
+
+
+class MediaBlob(BaseModel):
+    content_hash = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='property_media', max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.content_hash
+
 
 class PropertyMedia(BaseModel):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='property_media')
     media = models.FileField(upload_to='property_media')
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, null=True, blank=True,
+                             related_name='property_media')
+    position = models.PositiveIntegerField(default=0)
+    media_url = models.CharField(max_length=500, blank=True, default='')
+    media_url_version = models.CharField(max_length=12, blank=True, default='')
+
+    class Meta:
+        ordering = ('position', 'created')
 
     def __str__(self):
         return self.property.name
 
+    def get_url(self):
+        # Use the URL resolved when the media was saved, unless the storage configuration changed since
+        if self.media_url and self.media_url_version == get_media_url_version():
+            return self.media_url
+        return self.media.url
+
+    def refresh_url(self):
+        self.media_url = self.media.url
+        self.media_url_version = get_media_url_version()
+
+
+class MediaUpload(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='media_uploads')
+    file_name = models.CharField(max_length=255)
+    upload_length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True, help_text="Set while a chunk is being written")
+
+    def __str__(self):
+        return self.file_name
+
+    @property
+    def is_complete(self):
+        return self.offset == self.upload_length
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.MEDIA_UPLOAD_TEMP_DIR, f"{self.id}.part")
+
 
 class FavoriteProperty(BaseModel):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='favorite_property')
@@ -107,6 +173,10 @@ class FavoriteProperty(BaseModel):
         constraints = [
             UniqueConstraint(fields=['property', 'user'], name='unique_favorite_property')
         ]
+        indexes = [
+            # Walks the followers of one ad in id order, see apps.property.jobs.notify_price_drop
+            models.Index(fields=['property', 'id'], name='favorite_property_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.user.full_name
@@ -124,11 +194,30 @@ class PromoteAdRequest(BaseModel):
     phone_number = models.CharField(max_length=30, validators=[validate_phone_number])
     buy_or_rent = models.BooleanField(default=False)
     sell = models.BooleanField(default=False)
+    # Closed requests keep their last matches but are no longer matched against new listings
+    closed = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.location} - {self.desired_price}"
 
 
+class PromoteAdMatch(BaseModel):
+    request = models.ForeignKey(PromoteAdRequest, on_delete=models.CASCADE, related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='promote_ad_matches')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'Promote Ad Matches'
+        ordering = ('rank',)
+        constraints = [
+            UniqueConstraint(fields=['request', 'property'], name='unique_promote_ad_match')
+        ]
+
+    def __str__(self):
+        return f"{self.request} - {self.property.name}"
+
+
 class ContactCompany(BaseModel):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='property_contact')
     company = models.ForeignKey(User, on_delete=models.CASCADE, related_name='company_contact')
@@ -142,3 +231,56 @@ class ContactCompany(BaseModel):
 
     def __str__(self):
         return self.name
+
+
+class SavedSearch(BaseModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=255, blank=True, default='')
+    # The filter as the user saved it, using the PropertyAdFilter parameter names
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Predicate columns pulled out of params so new ads can be matched with an index lookup, empty means any
+    ad_category = models.CharField(max_length=255, blank=True, default='')
+    property_type = models.CharField(max_length=255, blank=True, default='')
+    city = models.CharField(max_length=255, blank=True, default='')
+    bucket_key = models.CharField(max_length=40)
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Saved Searches'
+        indexes = [
+            models.Index(fields=['bucket_key', 'price_min', 'price_max'], name='saved_search_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return self.name or str(self.params)
+
+    def matches_property(self, property_ad: Property, feature_names: set) -> bool:
+        # The predicates the bucket lookup doesn't cover, checked on the few candidates it returns
+        params = self.params
+        if params.get('surface_build_min') is not None and property_ad.surface_build < params['surface_build_min']:
+            return False
+        if params.get('surface_build_max') is not None and property_ad.surface_build > params['surface_build_max']:
+            return False
+        if params.get('rooms') is not None and property_ad.number_of_rooms != params['rooms']:
+            return False
+        if params.get('floors') is not None and property_ad.floors != params['floors']:
+            return False
+        if params.get('features') and params['features'] not in feature_names:
+            return False
+        return True
+
+
+class SavedSearchMatch(BaseModel):
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='saved_search_matches')
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Saved Search Matches'
+        constraints = [
+            UniqueConstraint(fields=['saved_search', 'property'], name='unique_saved_search_match')
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search} - {self.property}"
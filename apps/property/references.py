@@ -0,0 +1,8 @@
+from apps.common.references import ReferenceCache
+from apps.property.models import AdCategory, PropertyType, PropertyState, PropertyFeature
+
+# Lookup tables listings point at, edited from the admin and read on every create and update
+ad_categories = ReferenceCache(AdCategory)
+property_types = ReferenceCache(PropertyType)
+property_states = ReferenceCache(PropertyState)
+property_features = ReferenceCache(PropertyFeature)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from itertools import product
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework import status
+
+from apps.common.errors import ErrorCode
+from apps.common.exceptions import RequestError
+from apps.property.models import SavedSearch, Property, SavedSearchMatch
+
+
+def normalize_term(value) -> str:
+    return ' '.join(str(value or '').split()).casefold()
+
+
+def get_bucket_key(ad_category: str, property_type: str, city: str) -> str:
+    # Empty parts stand for "any", so a saved search lives in exactly one bucket
+    raw = '\n'.join(normalize_term(part) for part in (ad_category, property_type, city))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_candidate_bucket_keys(property_ad: Property) -> list[str]:
+    # Every bucket a saved search matching this ad can be in: each part is either the ad's value or "any"
+    ad_category = property_ad.ad_category.name if property_ad.ad_category_id else ''
+    property_type = property_ad.property_type.name if property_ad.property_type_id else ''
+    return list({
+        get_bucket_key(*parts)
+        for parts in product((ad_category, ''), (property_type, ''), (property_ad.city, ''))
+    })
+
+
+def create_saved_search(user, params: dict, name: str = '') -> SavedSearch:
+    if SavedSearch.objects.filter(user=user).count() >= settings.SAVED_SEARCH_LIMIT:
+        raise RequestError(err_code=ErrorCode.NOT_ALLOWED,
+                           err_msg=f"You can have at most {settings.SAVED_SEARCH_LIMIT} saved searches",
+                           status_code=status.HTTP_400_BAD_REQUEST)
+
+    # Store the parameters exactly as they read back from the database
+    params = json.loads(json.dumps(params, cls=DjangoJSONEncoder))
+
+    ad_category = normalize_term(params.get('ad_category'))
+    property_type = normalize_term(params.get('property_type'))
+    city = normalize_term(params.get('city'))
+    return SavedSearch.objects.create(
+        user=user,
+        name=name,
+        params=params,
+        ad_category=ad_category,
+        property_type=property_type,
+        city=city,
+        bucket_key=get_bucket_key(ad_category, property_type, city),
+        price_min=params.get('price_min'),
+        price_max=params.get('price_max'),
+    )
+
+
+def find_matching_saved_searches(property_ad: Property) -> list[SavedSearch]:
+    """
+    Saved searches an approved ad satisfies.
+
+    The ad's category, type and city select at most eight buckets through the index and the price
+    range narrows them down in the same query, only what is left is checked in Python.
+    """
+    candidates = SavedSearch.objects.filter(
+        Q(price_min__isnull=True) | Q(price_min__lte=property_ad.price),
+        Q(price_max__isnull=True) | Q(price_max__gte=property_ad.price),
+        bucket_key__in=get_candidate_bucket_keys(property_ad),
+    )
+    if property_ad.lister_id:
+        candidates = candidates.exclude(user_id=property_ad.lister_id)
+
+    feature_names = set(property_ad.features.values_list('name', flat=True))
+    return [
+        saved_search for saved_search in candidates.iterator()
+        if saved_search.matches_property(property_ad, feature_names)
+    ]
+
+
+def record_saved_search_matches(property_ad: Property) -> set:
+    # Returns the users who have new matches waiting for their digest
+    saved_searches = find_matching_saved_searches(property_ad)
+    SavedSearchMatch.objects.bulk_create(
+        [SavedSearchMatch(saved_search=saved_search, property=property_ad) for saved_search in saved_searches],
+        ignore_conflicts=True, batch_size=1000,
+    )
+    return {saved_search.user_id for saved_search in saved_searches}
+
+
+def get_saved_searches(user) -> list[SavedSearch]:
+    return SavedSearch.objects.filter(user=user).order_by('-created')
+
+
+def delete_saved_search(user, saved_search_id: str) -> None:
+    deleted, _ = SavedSearch.objects.filter(user=user, id=saved_search_id).delete()
+    if not deleted:
+        raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Saved search not found",
+                           status_code=status.HTTP_404_NOT_FOUND)
@@ -5,9 +5,11 @@ from rest_framework import status
 
 from apps.common.errors import ErrorCode
 from apps.common.exceptions import RequestError
+from apps.common.identity import load, load_related
 from apps.core.models import CompanyProfile, CompanyAgent, CompanyAvailability
 from apps.property.choices import APPROVED
-from apps.property.models import Property, PropertyMedia, FavoriteProperty, PropertyFeature
+from apps.property.media import create_property_media, check_media_limit, open_completed_uploads
+from apps.property.models import Property, PropertyMedia, FavoriteProperty
 from apps.property.serializers import PropertyAdSerializer
 
 User = get_user_model()
@@ -21,7 +23,7 @@ def get_dashboard_details(user: User) -> QuerySet[Property]:
 
 def terminate_property_ad(user: User, ad_id: str) -> None:
     try:
-        property_ad = Property.objects.get(lister=user, id=ad_id)
+        property_ad = load(Property.objects, lister=user, id=ad_id)
 
         # if the ad has already been terminated
         if property_ad.terminated:
@@ -56,7 +58,7 @@ def get_searched_property_ads(search: str) -> list[Property]:
 
 def get_property_for_user(user: User, property_id: str) -> Property:
     try:
-        return Property.objects.get(lister=user, id=property_id)
+        return load(Property.objects, lister=user, id=property_id)
     except Property.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Property not found",
                            status_code=status.HTTP_404_NOT_FOUND)
@@ -64,7 +66,7 @@ def get_property_for_user(user: User, property_id: str) -> Property:
 
 def get_property_media(item_id: str, property_ad: Property) -> PropertyMedia:
     try:
-        return PropertyMedia.objects.select_related('property').get(id=item_id, property=property_ad)
+        return load(PropertyMedia.objects.select_related('property'), id=item_id, property=property_ad)
     except PropertyMedia.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Property not found",
                            status_code=status.HTTP_404_NOT_FOUND)
@@ -74,7 +76,7 @@ def update_property(serialized_data: dict, property_ad: Property) -> None:
     try:
         # Update specific fields from validated data (excluding features and media)
         for key, value in serialized_data.items():
-            if key not in ('features', 'media'):
+            if key not in ('features', 'media', 'upload_ids', 'remove_media', 'media_order'):
                 setattr(property_ad, key, value)
 
         # Update features (ManyToMany)
@@ -82,13 +84,14 @@ def update_property(serialized_data: dict, property_ad: Property) -> None:
         if features:
             update_features(property_ad, features)
 
-        # Update media data (files)
-        media = serialized_data.get('media')
-        if media:
-            update_media(property_ad, media_data=media)
+        # Apply the media delta (files to add, media to remove and the new order)
+        update_media(property_ad, media_data=serialized_data.get('media'), upload_ids=serialized_data.get('upload_ids'),
+                     removed_ids=serialized_data.get('remove_media'), order=serialized_data.get('media_order'))
 
         property_ad.save()
 
+    except RequestError:
+        raise
     except Exception as e:
         raise RequestError(err_code=ErrorCode.OTHER_ERROR, status_code=status.HTTP_400_BAD_REQUEST,
                            err_msg=f"An error occurred while updating the property ad: {e}")
@@ -101,44 +104,68 @@ def update_features(property_ad: Property, features: list) -> None:
     features_to_add = set(features) - set(existing_features)
     features_to_remove = set(existing_features) - set(features)
 
-    # Add new features
+    # Add new features, already resolved by the serializer
     if features_to_add:
-        feature_instances = PropertyFeature.objects.filter(name__in=features_to_add)
-        property_ad.features.add(*feature_instances)
+        property_ad.features.add(*features_to_add)
 
     # Remove unwanted features
     property_ad.features.remove(*features_to_remove)
 
 
-def update_media(property_ad: Property, media_data: list) -> None:
-    existing_images = PropertyMedia.objects.filter(property=property_ad)
+def update_media(property_ad: Property, media_data: list = None, upload_ids: list = None, removed_ids: list = None,
+                 order: list = None) -> None:
+    existing_media = {media.id: media for media in PropertyMedia.objects.filter(property=property_ad)}
 
-    # Delete existing images only if new images are provided
-    if media_data:
-        existing_images.delete()
+    unknown_ids = set(removed_ids or []) | set(order or [])
+    unknown_ids -= existing_media.keys()
+    if unknown_ids:
+        raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Media not found",
+                           status_code=status.HTTP_404_NOT_FOUND)
 
-        # Create new PropertyImage objects for each uploaded image
-        property_images = [
-            PropertyMedia(property=property_ad, media=image_data)
-            for image_data in media_data
+    # Remove only the media that was asked for, blobs still in use elsewhere are kept
+    if removed_ids:
+        PropertyMedia.objects.filter(property=property_ad, id__in=removed_ids).delete()
+        for media_id in removed_ids:
+            existing_media.pop(media_id, None)
+
+    # Media listed in the order comes first, the rest keeps its current relative order
+    remaining_media = sorted(existing_media.values(), key=lambda media: (media.position, media.created))
+    if order:
+        ordered_ids = [media_id for media_id in dict.fromkeys(order) if media_id in existing_media]
+        remaining_media = [existing_media[media_id] for media_id in ordered_ids] + [
+            media for media in remaining_media if media.id not in ordered_ids
         ]
-        PropertyMedia.objects.bulk_create(property_images)
+
+    moved_media = []
+    for position, media in enumerate(remaining_media):
+        if media.position != position:
+            media.position = position
+            moved_media.append(media)
+    if moved_media:
+        PropertyMedia.objects.bulk_update(moved_media, ['position'])
+
+    # New files and finished uploads are appended after the existing media
+    with open_completed_uploads(property_ad.lister, upload_ids) as uploaded_files:
+        new_files = list(media_data or []) + uploaded_files
+        check_media_limit(len(remaining_media) + len(new_files))
+        if new_files:
+            create_property_media(property_ad, media_files=new_files, start_position=len(remaining_media))
 
 
 def get_company_profile(user: User) -> CompanyProfile:
     try:
-        return CompanyProfile.objects.select_related('user').get(user=user)
+        return load(CompanyProfile.objects.select_related('user'), user=user)
     except CompanyProfile.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Company profile not found",
                            status_code=status.HTTP_404_NOT_FOUND)
 
 
 def get_company_availability(company_profile: CompanyProfile) -> list[CompanyAvailability]:
-    try:
-        return CompanyAvailability.objects.select_related('company').filter(company=company_profile)
-    except CompanyProfile.DoesNotExist:
-        raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Availability not found",
-                           status_code=status.HTTP_404_NOT_FOUND)
+    return load_related(company_profile, 'available_days')
+
+
+def get_company_agents(company_profile: CompanyProfile) -> list[CompanyAgent]:
+    return load_related(company_profile, 'company_agents')
 
 
 def get_favorite_properties(user: User) -> list[FavoriteProperty]:
@@ -147,7 +174,7 @@ def get_favorite_properties(user: User) -> list[FavoriteProperty]:
 
 def get_single_property(property_id: str) -> Property:
     try:
-        return Property.objects.get(id=property_id)
+        return load(Property.objects, id=property_id)
     except Property.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Property not found",
                            status_code=status.HTTP_404_NOT_FOUND)
@@ -157,22 +184,24 @@ def handle_property_creation(validated_data: dict, user: User) -> dict:
     # Pop off features which are many to many
     features = validated_data.pop('features', [])
 
-    # Handle media files
+    # Handle media files, both sent with the request and uploaded beforehand
     media_data = validated_data.pop('media', [])
+    upload_ids = validated_data.pop('upload_ids', [])
 
     # Create property ad
     try:
         property_ad = Property.objects.create(lister=user, **validated_data)
 
-        # Add features if features exists
+        # Add features if features exists, the serializer already resolved them
         if features:
-            feature_instances = PropertyFeature.objects.filter(name__in=features)
-            property_ad.features.add(*feature_instances)
+            property_ad.features.add(*features)
 
         # Add media data if media data exists
-        if media_data:
-            media_instances = [PropertyMedia(property=property_ad, media=item) for item in media_data]
-            PropertyMedia.objects.bulk_create(media_instances)
+        with open_completed_uploads(user, upload_ids) as uploaded_files:
+            media_files = list(media_data) + uploaded_files
+            check_media_limit(len(media_files))
+            if media_files:
+                create_property_media(property_ad, media_files=media_files)
 
     except IntegrityError:
         raise RequestError(err_code=ErrorCode.ALREADY_EXISTS, err_msg="Property already exists",
@@ -194,7 +223,7 @@ def create_company_agent(company_profile: CompanyProfile, validated_data: dict)
 
 def get_company_agent(company_profile: CompanyProfile, agent_id: str) -> CompanyAgent:
     try:
-        return CompanyAgent.objects.get(company=company_profile, id=agent_id)
+        return load(CompanyAgent.objects, company=company_profile, id=agent_id)
     except CompanyAgent.DoesNotExist:
         raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="Agent not found",
                            status_code=status.HTTP_404_NOT_FOUND)
@@ -209,22 +238,23 @@ def handle_company_availability_creation(company: CompanyProfile, data: dict) ->
 
 
 def handle_company_availability_update(company: CompanyProfile, data: dict) -> None:
+    # The company's availabilities are loaded once, not once per updated record
+    availabilities = {
+        (availability.start_day, availability.last_day): availability
+        for availability in get_company_availability(company)
+    }
     for availability_data in data:
         start_day = availability_data['start_day']
         last_day = availability_data['last_day']
 
         # Fetch the specific availability record
-        try:
-            availability = CompanyAvailability.objects.get(
-                company=company,
-                start_day=start_day,
-                last_day=last_day
-            )
-            # Update the fields
-            availability.start_time = availability_data['start_time']
-            availability.end_time = availability_data['end_time']
-            availability.save()
-        except CompanyAvailability.DoesNotExist:
+        availability = availabilities.get((start_day, last_day))
+        if availability is None:
             # If it does not exist, specify error
             raise RequestError(err_code=ErrorCode.NON_EXISTENT, err_msg="This availability doesn't exist",
                                status_code=status.HTTP_404_NOT_FOUND)
+
+        # Update the fields
+        availability.start_time = availability_data['start_time']
+        availability.end_time = availability_data['end_time']
+        availability.save()
@@ -1,16 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import serializers as sr
 
+from apps.common.identity import load_related
+from apps.common.serializers import BatchLoadListSerializer, BulkPrimaryKeyRelatedField
 from apps.core.validators import validate_phone_number
+from apps.property.media import MAX_PROPERTY_MEDIA
 from apps.property.models import PropertyType, AdCategory, PropertyState, PropertyFeature, Property
+from apps.property.references import ad_categories, property_types, property_states, property_features
 
 User = get_user_model()
 
 
 class CreatePropertyAdSerializer(sr.Serializer):
-    property_type = sr.PrimaryKeyRelatedField(queryset=PropertyType.objects.all())
-    property_state = sr.PrimaryKeyRelatedField(queryset=PropertyState.objects.all())
-    ad_category = sr.PrimaryKeyRelatedField(queryset=AdCategory.objects.all())
+    property_type = BulkPrimaryKeyRelatedField(queryset=PropertyType.objects.all(), reference=property_types)
+    property_state = BulkPrimaryKeyRelatedField(queryset=PropertyState.objects.all(), reference=property_states)
+    ad_category = BulkPrimaryKeyRelatedField(queryset=AdCategory.objects.all(), reference=ad_categories)
     name = sr.CharField()
     city = sr.CharField()
     floors = sr.IntegerField()
@@ -26,15 +31,66 @@ class CreatePropertyAdSerializer(sr.Serializer):
     entry_date = sr.DateField()
     number_of_balcony = sr.IntegerField()
     car_parking = sr.IntegerField()
-    features = sr.PrimaryKeyRelatedField(many=True, queryset=PropertyFeature.objects.all())
+    features = BulkPrimaryKeyRelatedField(many=True, queryset=PropertyFeature.objects.all(),
+                                          reference=property_features)
     description = sr.CharField()
     matterport_view_link = sr.CharField()
-    media = sr.ListField(child=sr.FileField(), allow_empty=True, max_length=30)
+    media = sr.ListField(child=sr.FileField(), allow_empty=True, required=False, max_length=MAX_PROPERTY_MEDIA)
+    upload_ids = sr.ListField(child=sr.UUIDField(), allow_empty=True, required=False, max_length=MAX_PROPERTY_MEDIA)
     name_of_lister = sr.CharField()
     reachable_phone_number = sr.CharField(validators=[validate_phone_number])
 
 
+class UpdatePropertyAdSerializer(CreatePropertyAdSerializer):
+    # Files in media are added to the ad, existing media is removed or reordered by id
+    remove_media = sr.ListField(child=sr.UUIDField(), allow_empty=True, required=False)
+    media_order = sr.ListField(child=sr.UUIDField(), allow_empty=True, required=False)
+
+
+class CreateMediaUploadSerializer(sr.Serializer):
+    file_name = sr.CharField(max_length=255)
+    upload_length = sr.IntegerField(min_value=1, max_value=settings.MEDIA_UPLOAD_MAX_SIZE)
+
+
+class MediaUploadSerializer(sr.Serializer):
+    id = sr.UUIDField(read_only=True)
+    file_name = sr.CharField(read_only=True)
+    upload_length = sr.IntegerField(read_only=True)
+    offset = sr.IntegerField(read_only=True)
+    completed = sr.BooleanField(source='is_complete', read_only=True)
+
+
+class ListingStreamFilterSerializer(sr.Serializer):
+    ad_category = sr.CharField(required=False)
+    property_type = sr.CharField(required=False)
+    city = sr.CharField(required=False)
+    price_min = sr.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = sr.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+
+class SavedSearchSerializer(sr.Serializer):
+    # Same parameter names as the PropertyAdFilter listing filters, plus ad_category and city
+    id = sr.UUIDField(read_only=True)
+    name = sr.CharField(max_length=255, required=False, allow_blank=True)
+    ad_category = sr.CharField(required=False)
+    property_type = sr.CharField(required=False)
+    city = sr.CharField(required=False)
+    price_min = sr.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = sr.DecimalField(max_digits=10, decimal_places=2, required=False)
+    surface_build_min = sr.IntegerField(required=False, min_value=0)
+    surface_build_max = sr.IntegerField(required=False, min_value=0)
+    rooms = sr.IntegerField(required=False, min_value=0)
+    floors = sr.IntegerField(required=False, min_value=0)
+    features = sr.CharField(required=False)
+    created = sr.DateTimeField(read_only=True)
+
+    def to_representation(self, instance):
+        return {'id': instance.id, 'name': instance.name, **instance.params, 'created': instance.created}
+
+
 class PropertyAdMiniSerializer(sr.Serializer):
+    batch_load = ('property_media',)
+
     id = sr.UUIDField(read_only=True)
     image = sr.SerializerMethodField()
     name = sr.CharField()
@@ -48,13 +104,18 @@ class PropertyAdMiniSerializer(sr.Serializer):
     total_surface = sr.IntegerField()
     lister_phone_number = sr.SerializerMethodField()
 
+    class Meta:
+        list_serializer_class = BatchLoadListSerializer
+
     @staticmethod
     def get_lister_phone_number(obj):
         return obj.lister.phone_number
 
     @staticmethod
     def get_image(obj):
-        return obj.property_media.first().media.url
+        # Ads can be approved without media, they are listed without an image
+        media = load_related(obj, 'property_media')
+        return media[0].get_url() if media else None
 
     @staticmethod
     def get_discounted_price(obj):
@@ -62,8 +123,11 @@ class PropertyAdMiniSerializer(sr.Serializer):
 
 
 class PropertyAdSerializer(sr.ModelSerializer):
+    batch_load = ('property_media',)
+
     id = sr.UUIDField(read_only=True)
     media_urls = sr.SerializerMethodField()
+    media_items = sr.SerializerMethodField()
     discounted_price = sr.SerializerMethodField()
     lister = sr.PrimaryKeyRelatedField(queryset=User.objects.all())
     lister_name = sr.StringRelatedField(source='lister')
@@ -80,6 +144,7 @@ class PropertyAdSerializer(sr.ModelSerializer):
     class Meta:
         model = Property
         exclude = ['created', 'updated']
+        list_serializer_class = BatchLoadListSerializer
 
     @staticmethod
     def get_discounted_price(obj):
@@ -92,12 +157,26 @@ class PropertyAdSerializer(sr.ModelSerializer):
     @staticmethod
     def get_media_urls(obj):
         media_urls = []
-        for media in obj.property_media.all():
-            media_urls.append(media.media.url)
+        for media in load_related(obj, 'property_media'):
+            media_urls.append(media.get_url())
         return media_urls
 
+    @staticmethod
+    def get_media_items(obj):
+        return [
+            {
+                "id": media.id,
+                "url": media.get_url(),
+                "position": media.position
+            }
+            for media in load_related(obj, 'property_media')
+        ]
+
 
 class FavoritePropertySerializer(sr.Serializer):
+    batch_load = ('property__lister', 'property__property_type', 'property__property_state', 'property__ad_category',
+                  'property__features', 'property__property_media')
+
     media_urls = sr.SerializerMethodField()
     discounted_price = sr.SerializerMethodField()
     lister = sr.CharField(source='property.lister')
@@ -112,6 +191,9 @@ class FavoritePropertySerializer(sr.Serializer):
     feature_names = sr.SerializerMethodField()  # Use the method to retrieve names
     lister_phone_number = sr.SerializerMethodField()
 
+    class Meta:
+        list_serializer_class = BatchLoadListSerializer
+
     @staticmethod
     def get_lister_phone_number(obj):
         return obj.property.lister.phone_number
@@ -131,8 +213,8 @@ class FavoritePropertySerializer(sr.Serializer):
     @staticmethod
     def get_media_urls(obj):
         media_urls = []
-        for media in obj.property.property_media.all():
-            media_urls.append(media.media.url)
+        for media in load_related(obj.property, 'property_media'):
+            media_urls.append(media.get_url())
         return media_urls
 
 
@@ -161,6 +243,29 @@ class PromoteAdSerializer(sr.Serializer):
     phone_number = sr.CharField(validators=[validate_phone_number])
 
 
+class PromoteAdLeadSerializer(sr.Serializer):
+    id = sr.UUIDField(read_only=True)
+    first_name = sr.CharField()
+    last_name = sr.CharField()
+    email_address = sr.EmailField()
+    phone_number = sr.CharField()
+    location = sr.CharField()
+    property_type = sr.CharField()
+    surface = sr.IntegerField()
+    rooms = sr.IntegerField()
+    desired_price = sr.DecimalField(max_digits=10, decimal_places=2)
+    created = sr.DateTimeField()
+
+
+class PromoteAdMatchSerializer(sr.Serializer):
+    id = sr.UUIDField(read_only=True)
+    score = sr.FloatField()
+    rank = sr.IntegerField()
+    property_id = sr.UUIDField()
+    property_name = sr.CharField(source='property.name')
+    lead = PromoteAdLeadSerializer(source='request')
+
+
 class CompanyAvailabilitySerializer(sr.Serializer):
     start_day = sr.CharField()
     last_day = sr.CharField()
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.notification.choices import AD_APPROVED, AD_REJECTED, AD_TERMINATED
+from apps.notification.selectors import notify_property_ad_status
+from apps.property.choices import APPROVED, REJECTED
+from apps.property.jobs import match_saved_searches, notify_price_drop
+from apps.property.media import release_media_blobs
+from apps.property.models import PropertyMedia, Property
+from apps.property.streams import publish_approved_listing
+
+
+@receiver(post_delete, sender=PropertyMedia)
+def release_property_media_blob(sender, instance, **kwargs):
+    # Cascading deletes (e.g. deleting a property ad) go through here as well
+    if instance.blob_id:
+        release_media_blobs([instance.blob_id])
+
+
+@receiver(post_save, sender=Property)
+def property_ad_changed(sender, instance, created, **kwargs):
+    # Covers changes from the admin as well as from the agent endpoints
+    changes = {} if created else instance.get_tracked_changes()
+
+    if 'ad_status' in changes and instance.ad_status == APPROVED:
+        notify_property_ad_status(instance, AD_APPROVED)
+        if not instance.terminated:
+            transaction.on_commit(lambda: publish_approved_listing(instance))
+            match_saved_searches.enqueue(property_id=instance.id)
+    elif 'ad_status' in changes and instance.ad_status == REJECTED:
+        notify_property_ad_status(instance, AD_REJECTED)
+
+    if 'terminated' in changes and instance.terminated:
+        notify_property_ad_status(instance, AD_TERMINATED)
+
+    if ('price' in changes or 'discount' in changes) and instance.ad_status == APPROVED and not instance.terminated:
+        old_price = instance.get_effective_price(changes.get('price'), changes.get('discount'))
+        if instance.get_effective_price() < old_price:
+            # Followers are notified in the background, however many there are the update stays one insert
+            notify_price_drop.enqueue(property_id=instance.id, old_price=old_price, key=f'price-drop:{instance.id}')
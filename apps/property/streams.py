@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.property.models import Property
+from apps.property.serializers import PropertyAdMiniSerializer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ListingEvent:
+    # The fields subscribers filter on, and the SSE message encoded once for all of them
+    ad_category: str
+    property_type: str
+    city: str
+    price: Decimal
+    message: bytes
+
+
+@dataclass(frozen=True)
+class ListingFilter:
+    ad_category: str = None
+    property_type: str = None
+    city: str = None
+    price_min: Decimal = None
+    price_max: Decimal = None
+
+    def matches(self, event: ListingEvent) -> bool:
+        # Same semantics as PropertyAdListingFilter and the search by city endpoint
+        if self.ad_category and event.ad_category != self.ad_category:
+            return False
+        if self.property_type and event.property_type != self.property_type:
+            return False
+        if self.city and self.city.casefold() not in event.city.casefold():
+            return False
+        if self.price_min is not None and event.price < self.price_min:
+            return False
+        if self.price_max is not None and event.price > self.price_max:
+            return False
+        return True
+
+
+class ListingSubscription:
+    def __init__(self, listing_filter: ListingFilter, max_queue: int):
+        self.filter = listing_filter
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def offer(self, event: ListingEvent):
+        # A client that stopped reading loses events rather than holding memory for them
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping listing event for a slow stream subscriber")
+
+
+class ListingBroadcastHub:
+    """
+    In-process fan-out of newly approved listings to every open stream in this process.
+
+    Publishing matches each subscriber's filter in memory and hands the pre-encoded event to
+    its event loop, so one approval costs no queries per subscriber.
+    """
+
+    def __init__(self, max_queue: int = None):
+        self.max_queue = max_queue or settings.LISTING_STREAM_QUEUE_SIZE
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, listing_filter: ListingFilter) -> ListingSubscription:
+        subscription = ListingSubscription(listing_filter, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ListingSubscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: ListingEvent):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            if subscription.filter.matches(event):
+                # Publishers run in sync threads, the queues belong to the server's event loop
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+
+listing_hub = ListingBroadcastHub()
+
+
+def encode_listing_event(property_ad: Property) -> ListingEvent:
+    data = json.dumps(PropertyAdMiniSerializer(property_ad).data, cls=DjangoJSONEncoder)
+    return ListingEvent(
+        ad_category=property_ad.ad_category.name if property_ad.ad_category_id else '',
+        property_type=property_ad.property_type.name if property_ad.property_type_id else '',
+        city=property_ad.city,
+        price=property_ad.price,
+        message=f"id: {property_ad.id}\nevent: listing\ndata: {data}\n\n".encode(),
+    )
+
+
+def publish_approved_listing(property_ad: Property) -> None:
+    if not listing_hub.subscriber_count:
+        return
+
+    try:
+        listing_hub.publish(encode_listing_event(property_ad))
+    except Exception:
+        logger.exception("Failed to publish approved listing %s", property_ad.id)
+
+
+async def stream_listings(listing_filter: ListingFilter):
+    """
+    Yield SSE messages for approved listings that match the filter.
+
+    Comments are sent while idle to keep proxies from closing the connection. The stream ends
+    after LISTING_STREAM_MAX_DURATION, EventSource clients then reconnect on their own.
+    """
+    subscription = listing_hub.subscribe(listing_filter)
+    deadline = time.monotonic() + settings.LISTING_STREAM_MAX_DURATION
+    try:
+        yield f"retry: {settings.LISTING_STREAM_RETRY * 1000}\n\n".encode()
+        while time.monotonic() < deadline:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.LISTING_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield event.message
+    finally:
+        listing_hub.unsubscribe(subscription)
@@ -13,11 +13,16 @@ urlpatterns = [
     path('state', RetrievePropertyStateView.as_view(), name='property-states'),
     path('features', RetrievePropertyFeaturesView.as_view(), name='property-features'),
     path('create/ad', CreatePropertyAdView.as_view(), name='create-property-ad'),
+    path('uploads', CreateMediaUploadView.as_view(), name='create-media-upload'),
+    path('uploads/<uuid:upload_id>', RetrieveUpdateDeleteMediaUploadView.as_view(),
+         name='retrieve-update-delete-media-upload'),
     path('retrieve/update/delete/ad/<str:id>', RetrieveUpdateDeletePropertyAdView.as_view(),
          name='retrieve-update-property-ad'),
     path('company-profile/details', RetrieveUpdateCompanyProfileView.as_view(), name='retrieve-update-delete-agent'),
     path('favorite/properties/<str:id>', CreateDeleteFavoritePropertyView.as_view(),
          name='create-delete-favorite-property'),
+    path('saved/searches', RetrieveCreateSavedSearchView.as_view(), name='retrieve-create-saved-searches'),
+    path('saved/searches/<uuid:id>', DeleteSavedSearchView.as_view(), name='delete-saved-search'),
     path('favorite/all', RetrieveAllFavoritesPropertyView.as_view(),
          name='retrieve-all-favorite-properties'),
     path('create/agents', RegisterCompanyAgentView.as_view(), name='register-company-agent'),
@@ -25,8 +30,10 @@ urlpatterns = [
     path('company/agent/<str:agent_id>/update', UpdateCompanyAgentView.as_view(), name='update-company-agent'),
     path('promote/buy', PromoteBuyAdView.as_view(), name='promote-buy-ad'),
     path('promote/sell', PromoteSellAdView.as_view(), name='promote-sell-ad'),
+    path('promote/matches', RetrievePromoteAdMatchesView.as_view(), name='retrieve-promote-ad-matches'),
     path('company/availability', CreateCompanyTimeView.as_view(), name='add-company-availability'),
     path('listings/all', RetrieveAllPropertyAdListingView.as_view(), name='retrieve-all-property-ad-listings'),
+    path('listings/stream', StreamApprovedListingsView.as_view(), name='stream-approved-listings'),
     path('listings/city', SearchPropertyListingsByCityView.as_view(),
          name='search-property-ad-listings-by-city'),
     path('listings', SearchAllPropertyListingsView.as_view(), name='search-property-ad-listings'),
@@ -1,4 +1,6 @@
 from django.db import transaction, IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiTypes, OpenApiExample
 from rest_framework import status
@@ -10,18 +12,25 @@ from apps.common.exceptions import RequestError
 from apps.common.permissions import IsAuthenticatedAgent
 from apps.common.responses import CustomResponse
 from apps.core.serializers import CompanyProfileSerializer
+from apps.notification.selectors import notify_contact_request
 from apps.property.choices import APPROVED
 from apps.property.filters import AdFilter, PropertyAdFilter, PropertyAdListingFilter
+from apps.property.jobs import schedule_promote_ad_matching, schedule_media_upload_cleanup
+from apps.property.leads import get_agent_promote_ad_matches
+from apps.property.media import create_media_upload, get_media_upload, append_media_upload_chunk, delete_media_upload
 from apps.property.models import Property, AdCategory, PropertyType, PropertyState, PropertyFeature, FavoriteProperty, \
     PromoteAdRequest, ContactCompany
 from apps.property.selectors import get_dashboard_details, terminate_property_ad, get_searched_property_ads, \
     get_property_for_user, get_company_profile, get_favorite_properties, get_single_property, \
     handle_property_creation, update_property, create_company_agent, get_company_agent, \
     handle_company_availability_creation, get_company_availability, handle_company_availability_update, \
-    get_searched_property_ads_by_user
+    get_searched_property_ads_by_user, get_company_agents
 from apps.property.serializers import CreatePropertyAdSerializer, PropertyAdSerializer, FavoritePropertySerializer, \
     RegisterCompanyAgentSerializer, PromoteAdSerializer, MultipleAvailabilitySerializer, CompanyAvailabilitySerializer, \
-    PropertyAdMiniSerializer, ContactAgentSerializer
+    PropertyAdMiniSerializer, ContactAgentSerializer, UpdatePropertyAdSerializer, CreateMediaUploadSerializer, \
+    MediaUploadSerializer, ListingStreamFilterSerializer, SavedSearchSerializer, PromoteAdMatchSerializer
+from apps.property.searches import create_saved_search, get_saved_searches, delete_saved_search
+from apps.property.streams import ListingFilter, stream_listings
 
 # Create your views here.
 
@@ -131,6 +140,7 @@ class TerminatePropertyAdView(APIView):
 
 class SearchAgentDashboardView(APIView):
     permission_classes = [IsAuthenticatedAgent]
+    throttle_scope = 'search'
 
     @extend_schema(
         summary="Search agent dashboard",
@@ -519,7 +529,11 @@ class RetrieveUpdateDeletePropertyAdView(APIView):
         description="""
         This endpoint allows an authenticated agent to update a property ad
         Use this endpoint for both buy and sell
+
+        Media is updated incrementally: files sent in `media` are added after the existing media,
+        `remove_media` takes the ids of media to delete and `media_order` takes media ids in the new display order.
         """,
+        request=UpdatePropertyAdSerializer,
         tags=['Agent Dashboard'],
         responses={
             status.HTTP_202_ACCEPTED: OpenApiResponse(
@@ -551,7 +565,7 @@ class RetrieveUpdateDeletePropertyAdView(APIView):
             raise RequestError(status_code=status.HTTP_404_NOT_FOUND, err_msg="Property not found",
                                err_code=ErrorCode.NON_EXISTENT)
 
-        serializer = self.serializer_class(data=request.data, partial=True)
+        serializer = UpdatePropertyAdSerializer(data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
         data = serializer.validated_data
@@ -593,6 +607,135 @@ class RetrieveUpdateDeletePropertyAdView(APIView):
                                       status_code=status.HTTP_204_NO_CONTENT)
 
 
+class CreateMediaUploadView(APIView):
+    permission_classes = [IsAuthenticatedAgent]
+    serializer_class = CreateMediaUploadSerializer
+
+    @extend_schema(
+        summary="Create media upload",
+        description="""
+        This endpoint allows an authenticated agent to start a resumable upload for one media file
+
+        Uploads that receive no chunk for a day expire and are discarded
+        Send the file in chunks to the upload endpoint, then pass the upload id in `upload_ids`
+        when creating or updating a property ad
+        """,
+        tags=['Media Uploads'],
+        responses={
+            status.HTTP_201_CREATED: OpenApiResponse(
+                response=MediaUploadSerializer,
+                description="Successfully created media upload"
+            ),
+        }
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = create_media_upload(user=request.user, **serializer.validated_data)
+        # Abandoned uploads and their temp files are removed once they expire
+        schedule_media_upload_cleanup()
+        return CustomResponse.success(message="Successfully created media upload",
+                                      data=MediaUploadSerializer(upload).data, status_code=status.HTTP_201_CREATED)
+
+
+class RetrieveUpdateDeleteMediaUploadView(APIView):
+    permission_classes = [IsAuthenticatedAgent]
+
+    @extend_schema(
+        summary="Retrieve media upload",
+        description="""
+        This endpoint allows an authenticated agent to check how much of an upload the server has received
+        The offset is also returned in the `Upload-Offset` header, resume the upload from there
+        """,
+        tags=['Media Uploads'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=MediaUploadSerializer,
+                description="Successfully retrieved media upload"
+            ),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        upload = get_media_upload(user=request.user, upload_id=kwargs.get('upload_id'))
+
+        response = CustomResponse.success(message="Successfully retrieved media upload",
+                                          data=MediaUploadSerializer(upload).data)
+        response['Upload-Offset'] = str(upload.offset)
+        return response
+
+    @extend_schema(
+        summary="Upload media chunk",
+        description="""
+        This endpoint allows an authenticated agent to send the next chunk of an upload
+        Send the raw bytes as the request body with the `Upload-Offset` header set to the current offset
+        """,
+        request={'application/offset+octet-stream': OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter(name='Upload-Offset', location=OpenApiParameter.HEADER, type=OpenApiTypes.INT,
+                             description="Offset the chunk starts at", required=True),
+        ],
+        tags=['Media Uploads'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                response=MediaUploadSerializer,
+                description="Successfully uploaded media chunk"
+            ),
+            status.HTTP_409_CONFLICT: OpenApiResponse(
+                response={'application/json'},
+                description="Upload offset mismatch",
+                examples=[
+                    OpenApiExample(
+                        name="Offset mismatch",
+                        value={
+                            "status": "failure",
+                            "message": "Upload offset mismatch, expected 1048576",
+                            "code": "invalid_offset",
+                            "data": {
+                                "offset": 1048576
+                            }
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def patch(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            content_length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise RequestError(err_code=ErrorCode.INVALID_OFFSET, err_msg="Upload-Offset header is required",
+                               status_code=status.HTTP_400_BAD_REQUEST)
+
+        upload = append_media_upload_chunk(user=request.user, upload_id=kwargs.get('upload_id'), offset=offset,
+                                           stream=request.stream, content_length=content_length)
+
+        response = CustomResponse.success(message="Successfully uploaded media chunk",
+                                          data=MediaUploadSerializer(upload).data)
+        response['Upload-Offset'] = str(upload.offset)
+        return response
+
+    @extend_schema(
+        summary="Delete media upload",
+        description="""
+        This endpoint allows an authenticated agent to cancel an upload and discard what was received
+        """,
+        tags=['Media Uploads'],
+        responses={
+            status.HTTP_204_NO_CONTENT: OpenApiResponse(
+                description="Successfully deleted media upload"
+            ),
+        }
+    )
+    @transaction.atomic
+    def delete(self, request, *args, **kwargs):
+        upload = get_media_upload(user=request.user, upload_id=kwargs.get('upload_id'))
+        delete_media_upload(upload)
+        return CustomResponse.success(message="Successfully deleted media upload",
+                                      status_code=status.HTTP_204_NO_CONTENT)
+
+
 class RetrieveUpdateCompanyProfileView(APIView):
     permission_classes = [IsAuthenticatedAgent]
     serializer_class = CompanyProfileSerializer
@@ -723,23 +866,25 @@ class RetrieveUpdateCompanyProfileView(APIView):
     def get(self, request):
         user = request.user
         company_profile = get_company_profile(user=user)
-        company_availability = company_profile.available_days.all()
+        company_availability = get_company_availability(company_profile=company_profile)
         serialized_data = self.serializer_class(company_profile).data
         availability_data = CompanyAvailabilitySerializer(company_availability, many=True)
         queryset = Property.objects.filter(lister=user, ad_status=APPROVED, terminated=False)
         filtered_queryset = self.filterset_class(request.GET, queryset=queryset).qs.order_by('-created')
         total_number_of_ads = filtered_queryset.count()
 
+        properties = list(filtered_queryset)
         data = {
             "company_info": serialized_data,
             "company_availability": availability_data.data,
             "total_number_of_ads": total_number_of_ads,
             "ads": [
                 {
-                    "property": PropertyAdSerializer(each_property).data,
-                    "first_media_url": each_property.property_media.first().media.url  # URL of the first media file
+                    "property": property_data,
+                    # URL of the first media file, from the media the serializer already loaded, None without media
+                    "first_media_url": PropertyAdMiniSerializer.get_image(each_property)
                 }
-                for each_property in filtered_queryset
+                for each_property, property_data in zip(properties, PropertyAdSerializer(properties, many=True).data)
             ]
         }
         return CustomResponse.success(message="Successfully retrieved company profile", data=data)
@@ -879,7 +1024,7 @@ class RetrieveAllCompanyAgentView(APIView):
     def get(self, request):
         user = request.user
         company_profile = get_company_profile(user=user)
-        all_agents = company_profile.company_agents.all()
+        all_agents = get_company_agents(company_profile=company_profile)
 
         data = [
             {
@@ -1214,6 +1359,151 @@ class CreateDeleteFavoritePropertyView(APIView):
                                       status_code=status.HTTP_204_NO_CONTENT)
 
 
+class RetrieveCreateSavedSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = SavedSearchSerializer
+
+    @extend_schema(
+        summary="Retrieve saved searches",
+        description="""
+        This endpoint allows an authenticated user to retrieve their saved searches
+        """,
+        tags=['Saved Searches'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                description="Successfully retrieved saved searches",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Successfully retrieved saved searches",
+                            "data": [
+                                {
+                                    "id": "3f1c3a52-64c5-4f7c-9d0e-5a4c2e7e6c1d",
+                                    "name": "Flats in Lagos",
+                                    "ad_category": "Buy",
+                                    "property_type": "Apartment",
+                                    "city": "Lagos",
+                                    "price_max": "250000.00",
+                                    "rooms": 3,
+                                    "created": "2023-10-12T09:41:17.012345Z"
+                                }
+                            ]
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def get(self, request):
+        saved_searches = get_saved_searches(user=request.user)
+        serialized_data = self.serializer_class(saved_searches, many=True).data
+        return CustomResponse.success(message="Successfully retrieved saved searches", data=serialized_data)
+
+    @extend_schema(
+        summary="Save a search",
+        description="""
+        This endpoint allows an authenticated user to save a listing search. The parameters are the same as the
+        property filters, plus ad_category and city. Newly approved ads that match are sent to the user as a digest
+        """,
+        tags=['Saved Searches'],
+        responses={
+            status.HTTP_201_CREATED: OpenApiResponse(
+                description="Successfully saved search",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Successfully saved search",
+                            "data": {
+                                "id": "3f1c3a52-64c5-4f7c-9d0e-5a4c2e7e6c1d",
+                                "name": "Flats in Lagos",
+                                "city": "Lagos",
+                                "price_max": "250000.00",
+                                "created": "2023-10-12T09:41:17.012345Z"
+                            }
+                        }
+                    )
+                ]
+            ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                description="Too many saved searches",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Error response",
+                        value={
+                            "status": "failure",
+                            "message": "You can have at most 20 saved searches",
+                            "code": "not_allowed"
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    @transaction.atomic
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        name = params.pop('name', '')
+
+        saved_search = create_saved_search(user=request.user, params=params, name=name)
+        return CustomResponse.success(message="Successfully saved search",
+                                      data=self.serializer_class(saved_search).data,
+                                      status_code=status.HTTP_201_CREATED)
+
+
+class DeleteSavedSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Delete a saved search",
+        description="""
+        This endpoint allows an authenticated user to delete one of their saved searches
+        """,
+        tags=['Saved Searches'],
+        responses={
+            status.HTTP_204_NO_CONTENT: OpenApiResponse(
+                description="Successfully deleted saved search",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Successfully deleted saved search"
+                        }
+                    )
+                ]
+            ),
+            status.HTTP_404_NOT_FOUND: OpenApiResponse(
+                description="Saved search not found",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Error response",
+                        value={
+                            "status": "failure",
+                            "message": "Saved search not found",
+                            "code": "non_existent"
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def delete(self, request, *args, **kwargs):
+        delete_saved_search(user=request.user, saved_search_id=kwargs.get('id'))
+        return CustomResponse.success(message="Successfully deleted saved search",
+                                      status_code=status.HTTP_204_NO_CONTENT)
+
+
 class RetrievePropertyAdDetailsView(APIView):
     serializer_class = CreatePropertyAdSerializer
 
@@ -1287,6 +1577,9 @@ class PromoteBuyAdView(APIView):
         except Exception as e:
             raise RequestError(err_code=ErrorCode.OTHER_ERROR, err_msg=str(e), status_code=status.HTTP_400_BAD_REQUEST)
 
+        # Matched by a run shortly after, rather than at the next periodic run
+        schedule_promote_ad_matching()
+
         return CustomResponse.success(message="Successfully submitted ad promotion request")
 
 
@@ -1328,6 +1621,61 @@ class PromoteSellAdView(APIView):
         return CustomResponse.success(message="Successfully submitted ad promotion request")
 
 
+class RetrievePromoteAdMatchesView(APIView):
+    permission_classes = [IsAuthenticatedAgent]
+    serializer_class = PromoteAdMatchSerializer
+
+    @extend_schema(
+        summary="Retrieve promote ad leads",
+        description="""
+        This endpoint allows an authenticated agent to retrieve the open buy/rent promotion requests that match their
+        approved listings, best match first. Matches are refreshed periodically
+        """,
+        tags=['Promote with us'],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                description="Successfully retrieved promote ad leads",
+                response={'application/json'},
+                examples=[
+                    OpenApiExample(
+                        name="Success response",
+                        value={
+                            "status": "success",
+                            "message": "Successfully retrieved promote ad leads",
+                            "data": [
+                                {
+                                    "id": "0b6f4f7e-8d0b-4c61-a0f5-3a3b7f4d2c11",
+                                    "score": 0.9412,
+                                    "rank": 1,
+                                    "property_id": "691f0273-4c27-40ad-a809-3d7d0fb968d1",
+                                    "property_name": "Property 10",
+                                    "lead": {
+                                        "id": "5d2c1f0e-7c3b-4b8a-9e6d-1f2a3b4c5d6e",
+                                        "first_name": "Ada",
+                                        "last_name": "Obi",
+                                        "email_address": "ada@example.com",
+                                        "phone_number": "+2348012345678",
+                                        "location": "Lagos",
+                                        "property_type": "Apartment",
+                                        "surface": 120,
+                                        "rooms": 3,
+                                        "desired_price": "250000.00",
+                                        "created": "2023-10-12T09:41:17.012345Z"
+                                    }
+                                }
+                            ]
+                        }
+                    )
+                ]
+            )
+        }
+    )
+    def get(self, request):
+        matches = get_agent_promote_ad_matches(user=request.user)
+        serialized_data = self.serializer_class(matches, many=True).data
+        return CustomResponse.success(message="Successfully retrieved promote ad leads", data=serialized_data)
+
+
 class RetrieveAllPropertyAdListingView(APIView):
     filter_backends = [DjangoFilterBackend]
     filterset_class = PropertyAdListingFilter
@@ -1393,9 +1741,9 @@ class RetrieveAllPropertyAdListingView(APIView):
             "total_listings": total_number_of_ads,
             "listings": [
                 {
-                    "property": self.serializer_class(each_property).data,
+                    "property": property_data,
                 }
-                for each_property in filtered_queryset
+                for property_data in self.serializer_class(filtered_queryset, many=True).data
             ]
         }
         return CustomResponse.success(message="Successfully retrieved property ads", data=serialized_data)
@@ -1403,6 +1751,7 @@ class RetrieveAllPropertyAdListingView(APIView):
 
 class SearchPropertyListingsByCityView(APIView):
     serializer_class = PropertyAdMiniSerializer
+    throttle_scope = 'search'
 
     @extend_schema(
         summary="Search property listings by city",
@@ -1460,9 +1809,9 @@ class SearchPropertyListingsByCityView(APIView):
             "total_listings": total_number_of_ads,
             "listings": [
                 {
-                    "property": self.serializer_class(each_property).data,
+                    "property": property_data,
                 }
-                for each_property in queryset
+                for property_data in self.serializer_class(queryset, many=True).data
             ]
         }
         return CustomResponse.success(message="Successfully retrieved property ads", data=serialized_data)
@@ -1470,6 +1819,7 @@ class SearchPropertyListingsByCityView(APIView):
 
 class SearchAllPropertyListingsView(APIView):
     serializer_class = PropertyAdMiniSerializer
+    throttle_scope = 'search'
 
     @extend_schema(
         summary="Search property listings",
@@ -1526,15 +1876,39 @@ class SearchAllPropertyListingsView(APIView):
             "total_listings": get_property_ads.count(),
             "listings": [
                 {
-                    "property": self.serializer_class(each_property).data,
+                    "property": property_data,
                 }
-                for each_property in get_property_ads
+                for property_data in self.serializer_class(get_property_ads, many=True).data
             ]
         }
 
         return CustomResponse.success(message="Successfully retrieved searched results", data=serialized_data)
 
 
+class StreamApprovedListingsView(View):
+    """
+    Server-sent events stream of newly approved property ads, filtered by the same query parameters as
+    listings/all (ad_category, property_type, price_min, price_max) plus city.
+
+    Each approved ad arrives as a `listing` event with the same fields as a listing. This is a plain async
+    Django view because DRF views can't stream asynchronously, it has to be served over ASGI.
+    """
+
+    async def get(self, request):
+        serializer = ListingStreamFilterSerializer(data=request.GET)
+        if not serializer.is_valid():
+            errors = {key: str(error_list[0]) for key, error_list in serializer.errors.items()}
+            return JsonResponse({"status": "failure", "message": "Invalid Entry", "code": ErrorCode.INVALID_ENTRY,
+                                 "data": errors}, status=422)
+
+        response = StreamingHttpResponse(stream_listings(ListingFilter(**serializer.validated_data)),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx style proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class RequestPropertyTourView(APIView):
 
     @extend_schema(
@@ -1598,6 +1972,7 @@ class ContactAgentView(APIView):
 
         property_ad = get_single_property(property_id=property_id)
 
-        ContactCompany.objects.create(property=property_ad, company=property_ad.lister, **data)
+        contact = ContactCompany.objects.create(property=property_ad, company=property_ad.lister, **data)
+        notify_contact_request(contact)
         return CustomResponse.success(message="Successfully submitted contact request",
                                       status_code=status.HTTP_201_CREATED)
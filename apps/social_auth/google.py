@@ -1,5 +1,122 @@
-from google.auth.transport import requests
-from google.oauth2 import id_token
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from google.auth import exceptions, jwt
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def get_cache_lifetime(response: requests.Response) -> float:
+    # Seconds the response may be reused for, from Cache-Control and Age, else Expires
+    match = MAX_AGE_PATTERN.search(response.headers.get('Cache-Control', ''))
+    if match:
+        return max(int(match.group(1)) - int(response.headers.get('Age', 0)), 0)
+
+    if 'Expires' in response.headers:
+        try:
+            expires = parsedate_to_datetime(response.headers['Expires'])
+            date = parsedate_to_datetime(response.headers['Date']) if 'Date' in response.headers else None
+            return max(expires.timestamp() - (date.timestamp() if date else time.time()), 0)
+        except (TypeError, ValueError):
+            pass
+    return settings.GOOGLE_CERTS_DEFAULT_TTL
+
+
+class GoogleCertificates:
+    """
+    Google's signing certificates, fetched once per process and kept for as long as the response's
+    cache headers allow.
+
+    Within GOOGLE_CERTS_REFRESH_MARGIN seconds of expiry a background thread fetches them again while
+    the current ones keep being served, so verifying a token does no network I/O unless the certificates
+    have fully expired or the token was signed with a key they don't have yet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held for the whole request, so concurrent logins on a cold or expired cache share one fetch
+        self._fetch_lock = threading.Lock()
+        self._session = requests.Session()
+        self._certs = None
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._refreshing = False
+
+    def _fetch(self, seen_fetched_at: float = None) -> dict:
+        with self._fetch_lock:
+            # Another thread fetched while this one waited, its certificates are used instead
+            with self._lock:
+                if seen_fetched_at is not None and self._fetched_at > seen_fetched_at:
+                    return self._certs
+
+            response = self._session.get(settings.GOOGLE_CERTS_URL, timeout=settings.GOOGLE_CERTS_TIMEOUT)
+            if response.status_code != 200:
+                raise exceptions.TransportError(f"Could not fetch certificates at {settings.GOOGLE_CERTS_URL}")
+
+            certs = response.json()
+            now = time.monotonic()
+            with self._lock:
+                self._certs = certs
+                self._fetched_at = now
+                self._expires_at = now + get_cache_lifetime(response)
+            return certs
+
+    def _refresh(self) -> None:
+        try:
+            self._fetch()
+        except Exception:
+            # The current certificates are still valid, the next verification tries again
+            logger.exception("Failed to refresh Google certificates")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, key_id: str = None) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            certs, expires_at, fetched_at = self._certs, self._expires_at, self._fetched_at
+            refresh = certs is not None and now >= expires_at - settings.GOOGLE_CERTS_REFRESH_MARGIN \
+                and not self._refreshing
+            if refresh:
+                self._refreshing = True
+
+        # Google signs with a new key before the old response expires, an unknown one is fetched right
+        # away, at most once every GOOGLE_CERTS_MIN_FETCH_INTERVAL seconds
+        unknown_key = certs is not None and key_id is not None and key_id not in certs \
+            and now >= fetched_at + settings.GOOGLE_CERTS_MIN_FETCH_INTERVAL
+
+        if certs is None or now >= expires_at or unknown_key:
+            if refresh:
+                with self._lock:
+                    self._refreshing = False
+            return self._fetch(seen_fetched_at=fetched_at)
+
+        if refresh:
+            threading.Thread(target=self._refresh, name='google-certs-refresh', daemon=True).start()
+        return certs
+
+
+google_certificates = GoogleCertificates()
+
+
+def verify_oauth2_token(auth_token: str, audience=None) -> dict:
+    # Same checks as google.oauth2.id_token.verify_oauth2_token, with the cached certificates
+    certs = google_certificates.get(jwt.decode_header(auth_token).get('kid'))
+    id_info = jwt.decode(auth_token, certs=certs, audience=audience)
+    if id_info['iss'] not in GOOGLE_ISSUERS:
+        raise exceptions.GoogleAuthError(
+            f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}"
+        )
+    return id_info
 
 
 class Google:
@@ -7,9 +124,9 @@ class Google:
 
     @staticmethod
     def validate(auth_token):
-        # validate method queries, google oauth2 api to fetch the user info
+        # validate method checks the token's signature against google's cached certificates
         try:
-            id_info = id_token.verify_oauth2_token(auth_token, requests.Request())
+            id_info = verify_oauth2_token(auth_token)
             if 'accounts.google.com' in id_info['iss']:
                 return id_info
         except Exception as e:
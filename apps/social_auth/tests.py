@@ -0,0 +1,202 @@
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.test import SimpleTestCase, override_settings
+from google.auth import crypt, jwt
+
+from apps.social_auth import google
+from apps.social_auth.google import GoogleCertificates, Google, verify_oauth2_token
+
+
+# Create your tests here.
+
+
+def generate_key_pair() -> tuple[str, str]:
+    # Private key PEM to sign tokens with and a self-signed certificate PEM, like the ones Google serves
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'kemea-test')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256())
+
+    private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption()).decode()
+    return private_pem, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def sign_token(private_pem: str, key_id: str, **claims) -> str:
+    now = int(time.time())
+    payload = {'iss': 'https://accounts.google.com', 'aud': 'kemea', 'sub': '1', 'email': 'agent@kemea.com',
+               'iat': now, 'exp': now + 3600, **claims}
+    return jwt.encode(crypt.RSASigner.from_string(private_pem, key_id=key_id), payload).decode()
+
+
+class CertificateServer:
+    """
+    Local stand-in for Google's certificate endpoint, serving whatever certificates and headers a test sets.
+    """
+
+    def __init__(self):
+        self.certs = {}
+        self.headers = {'Cache-Control': 'public, max-age=3600'}
+        self.delay = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.requests += 1
+                time.sleep(stand_in.delay)
+                body = json.dumps(stand_in.certs).encode()
+                # Without the default Date header, so a test can set its own
+                self.send_response_only(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for header, value in stand_in.headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/oauth2/v1/certs"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class GoogleCertificatesTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_pem, cls.certificate_pem = generate_key_pair()
+        cls.new_private_pem, cls.new_certificate_pem = generate_key_pair()
+
+    def setUp(self):
+        self.server = CertificateServer()
+        self.server.certs = {'key-1': self.certificate_pem}
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        settings_override = override_settings(GOOGLE_CERTS_URL=self.server.url, GOOGLE_CERTS_REFRESH_MARGIN=60,
+                                              GOOGLE_CERTS_MIN_FETCH_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.certificates = GoogleCertificates()
+        # Runs before the server stops, so a background refresh never outlives it
+        self.addCleanup(self.wait_for_refresh)
+        patcher = mock.patch.object(google, 'google_certificates', self.certificates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_for_requests(self, count: int, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while self.server.requests < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def wait_for_refresh(self, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while self.certificates._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_certificates_are_kept_for_the_header_lifetime(self):
+        self.server.headers = {'Cache-Control': 'public, max-age=3600', 'Age': '600'}
+
+        self.assertEqual(self.certificates.get('key-1'), {'key-1': self.certificate_pem})
+        self.assertEqual(self.certificates.get('key-1'), {'key-1': self.certificate_pem})
+        self.assertEqual(self.server.requests, 1)
+        self.assertAlmostEqual(self.certificates._expires_at - self.certificates._fetched_at, 3000, delta=1)
+
+    def test_expires_header_is_used_without_cache_control(self):
+        self.server.headers = {'Expires': 'Wed, 21 Oct 2026 07:58:00 GMT', 'Date': 'Wed, 21 Oct 2026 07:28:00 GMT'}
+
+        self.certificates.get('key-1')
+        self.assertAlmostEqual(self.certificates._expires_at - self.certificates._fetched_at, 1800, delta=1)
+
+    def test_expired_certificates_are_fetched_again(self):
+        self.server.headers = {'Cache-Control': 'max-age=0'}
+
+        self.certificates.get('key-1')
+        self.certificates.get('key-1')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_certificates_close_to_expiry_are_refreshed_in_the_background(self):
+        # Within the refresh margin, the current certificates are served while new ones are fetched
+        self.server.headers = {'Cache-Control': 'max-age=30'}
+        self.certificates.get('key-1')
+
+        self.server.certs = {'key-1': self.certificate_pem, 'key-2': self.new_certificate_pem}
+        self.assertEqual(self.certificates.get('key-1'), {'key-1': self.certificate_pem})
+
+        self.wait_for_requests(2)
+        self.wait_for_refresh()
+        self.assertFalse(self.certificates._refreshing)
+        self.assertEqual(self.server.requests, 2)
+        self.assertIn('key-2', self.certificates.get('key-1'))
+
+    def test_unknown_key_is_fetched_right_away(self):
+        self.certificates.get('key-1')
+        self.server.certs = {'key-1': self.certificate_pem, 'key-2': self.new_certificate_pem}
+
+        self.assertIn('key-2', self.certificates.get('key-2'))
+        self.assertEqual(self.server.requests, 2)
+
+    @override_settings(GOOGLE_CERTS_MIN_FETCH_INTERVAL=60)
+    def test_unknown_key_is_not_fetched_more_often_than_the_minimum_interval(self):
+        self.certificates.get('key-1')
+
+        self.assertNotIn('key-2', self.certificates.get('key-2'))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_concurrent_requests_on_a_cold_cache_share_one_fetch(self):
+        self.server.delay = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.certificates.get('key-1')))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_token_signed_with_a_served_key_is_verified(self):
+        token = sign_token(self.private_pem, 'key-1')
+
+        id_info = verify_oauth2_token(token)
+        self.assertEqual(id_info['email'], 'agent@kemea.com')
+        self.assertEqual(Google.validate(token)['sub'], '1')
+
+    def test_token_with_a_bad_signature_is_rejected(self):
+        # Signed with another key than the one served under its key id
+        token = sign_token(self.new_private_pem, 'key-1')
+
+        with self.assertRaises(ValueError):
+            verify_oauth2_token(token)
+        self.assertIsInstance(Google.validate(token), str)
+
+    def test_token_from_a_wrong_issuer_is_rejected(self):
+        token = sign_token(self.private_pem, 'key-1', iss='https://evil.example.com')
+
+        self.assertIsInstance(Google.validate(token), str)
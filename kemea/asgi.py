@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kemea.settings')
 
-application = get_asgi_application()
+# Load the apps before anything that imports models
+django_asgi_application = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from apps.common.websocket import JWTAuthMiddleware  # noqa: E402
+from apps.notification.routing import websocket_urlpatterns  # noqa: E402
+
+# Websockets authenticate with an explicit bearer token rather than cookies, so there is no origin check;
+# native apps don't send an Origin header at all
+application = ProtocolTypeRouter({
+    'http': django_asgi_application,
+    'websocket': JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
@@ -19,6 +19,7 @@ ALLOWED_HOSTS = []
 
 # Application definition
 DJANGO_APPS = [
+    "daphne",  # serves runserver over ASGI so websockets work in development
     "jazzmin",  # not a django app but a custom django admin library
     "django.contrib.admin",
     "django.contrib.auth",
@@ -38,6 +39,7 @@ LOCAL_APPS = [
 ]
 
 THIRD_PARTY_APPS = [
+    "channels",
     "cloudinary_storage",
     "debug_toolbar",
     "django_filters",
@@ -63,21 +65,23 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.common.identity.IdentityMapMiddleware',
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.common.authentication.ClaimsJWTAuthentication",
     ),
     "COERCE_DECIMAL_TO_STRING": False,
     "EXCEPTION_HANDLER": "apps.common.exceptions.custom_exception_handler",
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "apps.common.throttles.AnonRateThrottle",
+        "apps.common.throttles.UserRateThrottle",
+        "apps.common.throttles.ScopedRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "5000/day", "user": "10000/day"},
+    "DEFAULT_THROTTLE_RATES": {"anon": "5000/day", "user": "10000/day", "search": "120/minute"},
     "NON_FIELD_ERRORS_KEY": "error",
     "COMPONENT_SPLIT_REQUEST": True
 }
@@ -129,6 +133,59 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = "core.User"
 
+# Authenticated requests read is_agent and email_verified from a per-process cache instead of loading the user.
+# Saving a user clears its entry in the saving process, other processes see the change after the TTL.
+AUTH_USER_CACHE_TTL = 30
+
+AUTH_USER_CACHE_SIZE = 10_000
+
+# Refresh and logout check a per-process Bloom filter of blacklisted tokens before the blacklist table.
+# Tokens blacklisted by other processes are picked up within TOKEN_BLACKLIST_SYNC_INTERVAL seconds.
+TOKEN_BLACKLIST_SYNC_INTERVAL = 1
+
+# Seconds between full rebuilds of the per-process blacklist filter, an upper bound on how long a late commit is missed
+TOKEN_BLACKLIST_REBUILD_INTERVAL = 300
+
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100_000
+
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+
+# Tokens issued at login are recorded as outstanding in bulk inserts, every TOKEN_OUTSTANDING_FLUSH_INTERVAL
+# seconds or once TOKEN_OUTSTANDING_FLUSH_SIZE are waiting. Turn off to insert each one during the login request.
+TOKEN_OUTSTANDING_BUFFERED = True
+
+TOKEN_OUTSTANDING_FLUSH_INTERVAL = 0.5
+
+TOKEN_OUTSTANDING_FLUSH_SIZE = 500
+
+# Most rows held per process while flushes fail, older ones are dropped past it
+TOKEN_OUTSTANDING_BUFFER_LIMIT = 50_000
+
+# Expired outstanding and blacklisted tokens are deleted this many at a time, every TOKEN_PRUNE_INTERVAL seconds
+TOKEN_PRUNE_BATCH_SIZE = 1000
+
+TOKEN_PRUNE_INTERVAL = 24 * 60 * 60
+
+# Google social login verifies tokens against certificates cached for as long as Google's cache headers allow,
+# refreshed in the background GOOGLE_CERTS_REFRESH_MARGIN seconds before they expire
+GOOGLE_CERTS_URL = config('GOOGLE_CERTS_URL', default='https://www.googleapis.com/oauth2/v1/certs')
+
+GOOGLE_CERTS_TIMEOUT = 5
+
+GOOGLE_CERTS_DEFAULT_TTL = 60 * 60
+
+GOOGLE_CERTS_REFRESH_MARGIN = 5 * 60
+
+GOOGLE_CERTS_MIN_FETCH_INTERVAL = 60
+
+# Throttle counters live in the database so every worker process shares them. About one request in
+# 1 / THROTTLE_PRUNE_PROBABILITY also queues a job that deletes the counters that have run out.
+THROTTLE_PRUNE_PROBABILITY = 0.001
+
+# Lookup tables (property types, categories, states, features) are cached per process and reloaded after
+# REFERENCE_DATA_TTL seconds, or sooner when a row is saved or an unknown id is asked for
+REFERENCE_DATA_TTL = 5 * 60
+
 ROOT_URLCONF = 'kemea.urls'
 
 TEMPLATES = [
@@ -149,6 +206,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'kemea.wsgi.application'
 
+ASGI_APPLICATION = 'kemea.asgi.application'
+
+# Websocket groups live in process memory, which is enough for tests and a single node.
+# Running several nodes needs a shared layer such as channels_redis so pushes reach every node.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "apps.common.websocket.SweepingInMemoryChannelLayer",
+    },
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -177,6 +244,20 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Same hashers as Django's default, with PBKDF2 run on PASSWORD_HASH_WORKERS threads per process. Up to
+# PASSWORD_HASH_QUEUE_SIZE more requests wait for one, the rest get a 503.
+PASSWORD_HASHERS = [
+    'apps.common.passwords.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASH_WORKERS = 2
+
+PASSWORD_HASH_QUEUE_SIZE = 16
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -213,6 +294,25 @@ MEDIA_URL = "media/"
 
 MEDIA_ROOT = BASE_DIR / "static/media"
 
+# Resumable media uploads are assembled here before being attached to a property ad
+MEDIA_UPLOAD_TEMP_DIR = BASE_DIR / "tmp/uploads"
+
+MEDIA_UPLOAD_MAX_SIZE = 25 * 1024 * 1024
+
+# Uploads in progress per user, and seconds without a chunk after which an upload expires and is removed
+MEDIA_UPLOAD_MAX_OPEN = 30
+
+MEDIA_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Seconds after which a chunk still being written is considered abandoned and its offset can be claimed again
+MEDIA_UPLOAD_CLAIM_TIMEOUT = 10 * 60
+
+# Number of files uploaded to the media storage at the same time, per process
+MEDIA_STORAGE_UPLOAD_WORKERS = 8
+
+# Media URLs are stored when media is saved, bump this to invalidate all of them
+MEDIA_URL_CACHE_VERSION = 1
+
 STORAGES = {
     "default": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
@@ -244,6 +344,82 @@ EMAIL_PORT = 465
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Emails are queued in the outbox and sent by a fixed pool of sender threads per process
+EMAIL_SENDER_WORKERS = 2
+
+EMAIL_SENDER_SHUTDOWN_TIMEOUT = 10
+
+EMAIL_OUTBOX_BATCH_SIZE = 20
+
+EMAIL_OUTBOX_POLL_INTERVAL = 30
+
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 300
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+
+# Seconds before the first retry, doubled after every failed attempt
+EMAIL_OUTBOX_RETRY_DELAY = 30
+
+# Background jobs are stored in the database and run by `manage.py runworker`
+JOB_WORKER_PROCESSES = 1
+
+JOB_WORKER_THREADS = 4
+
+# Seconds an idle worker thread waits before looking for due jobs again
+JOB_POLL_INTERVAL = 2
+
+# Seconds between heartbeats that keep the claim on a running job fresh
+JOB_HEARTBEAT_INTERVAL = 30
+
+# Seconds without a heartbeat after which a running job is considered abandoned by a dead worker and queued again
+JOB_CLAIM_TIMEOUT = 600
+
+JOB_MAX_ATTEMPTS = 3
+
+# Seconds before the first retry, doubled after every failed attempt
+JOB_RETRY_DELAY = 30
+
+# Seconds between queue metrics log lines from a running worker
+JOB_METRICS_INTERVAL = 60
+
+# Notifications for many recipients are inserted in batches of this size
+NOTIFICATION_BATCH_SIZE = 500
+
+NOTIFICATION_PAGE_SIZE = 20
+
+# Server-sent events stream of newly approved listings
+LISTING_STREAM_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle stream
+LISTING_STREAM_HEARTBEAT = 15
+
+# Seconds before a stream is closed, clients reconnect after LISTING_STREAM_RETRY seconds
+LISTING_STREAM_MAX_DURATION = 600
+
+LISTING_STREAM_RETRY = 5
+
+SAVED_SEARCH_LIMIT = 20
+
+# Seconds new matches are collected before they are sent to the user as one digest
+SAVED_SEARCH_DIGEST_DELAY = 60 * 60
+
+# Users who favorited an ad are notified of a price drop this many at a time, one job per chunk
+PRICE_DROP_CHUNK_SIZE = 1000
+
+# Open promote ad requests are matched against approved listings every PROMOTE_MATCH_INTERVAL seconds
+PROMOTE_MATCH_INTERVAL = 60 * 60
+
+# Seconds after a new promote ad request before a matching run, so requests arriving together share it
+PROMOTE_MATCH_NEW_REQUEST_DELAY = 60
+
+PROMOTE_MATCH_TOP_N = 10
+
+# Listings priced this fraction above the desired price are still matched, anything dearer is left out
+PROMOTE_MATCH_PRICE_TOLERANCE = 0.2
+
+# Upper bound on request x listing scores held in memory at once
+PROMOTE_MATCH_MAX_CELLS = 2_000_000
+
 JAZZMIN_SETTINGS = {
     "site_brand": "Kemea ADMIN",
     # title of the window (Will default to current_admin_site.site_title if absent or None)
@@ -10,6 +10,7 @@ urlpatterns_v1 = [
     path("property/", include("apps.property.urls")),
     path("social_auth/", include("apps.social_auth.urls")),
     path("misc/", include("apps.misc.urls")),
+    path("notification/", include("apps.notification.urls")),
 ]
 
 urlpatterns = [
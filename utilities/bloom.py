@@ -0,0 +1,56 @@
+import hashlib
+import math
+from typing import Iterable
+
+import numpy as np
+
+MASK_64 = (1 << 64) - 1
+
+
+def _hash_pair(item: str) -> tuple:
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    # The second hash is odd so its multiples cycle through every bit position
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    Set of strings that can answer "definitely not present" in a fixed-size bit array.
+
+    Lookups may report an item that was never added (about `error_rate` of the time while at most
+    `capacity` items were added, more after that) but never miss one that was. Items can't be removed,
+    owners rebuild the filter when it has filled up.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, item: str) -> list:
+        first, second = _hash_pair(item)
+        return [((first + index * second) & MASK_64) % self.size for index in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]) -> None:
+        # Same positions as add, computed for the whole batch at once
+        hashes = np.array([_hash_pair(item) for item in items], dtype=np.uint64).reshape(-1, 2)
+        if not len(hashes):
+            return
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        positions = ((hashes[:, :1] + steps * hashes[:, 1:]) % np.uint64(self.size)).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(hashes)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
@@ -1,34 +1,202 @@
+import atexit
+import html
+import logging
+import re
 import threading
+from datetime import timedelta
+from uuid import uuid4
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction, close_old_connections
+from django.template.loader import get_template
+from django.utils import timezone
 
+from apps.notification.choices import PENDING, SENDING, SENT, FAILED
+from apps.notification.models import EmailOutbox
 
-class EmailThread(threading.Thread):
-    def __init__(self, email):
-        self.email = email
-        super().__init__(group=None)
+logger = logging.getLogger(__name__)
 
-    def run(self):
-        self.email.send()
+HIDDEN_BLOCKS = re.compile(r'<(head|style|script)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+LINE_BREAK_TAGS = re.compile(r'<(br|/p|/div|/h[1-6]|/li|/tr)\b[^>]*>', re.IGNORECASE)
+
+TAGS = re.compile(r'<[^>]+>')
+
+BLANK_LINES = re.compile(r'\n\s*\n+')
+
+
+class EmailSender:
+    """
+    Fixed-size pool of threads that drains the email outbox.
+
+    Each thread claims a batch of due messages and sends the whole batch over one SMTP connection.
+    Failed messages are retried with exponential backoff until they run out of attempts.
+    """
+
+    def __init__(self, workers: int = None, batch_size: int = None):
+        self.workers = workers or settings.EMAIL_SENDER_WORKERS
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-sender-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.stop)
+
+    def wake(self):
+        self.start()
+        self._wake_event.set()
+
+    def stop(self, timeout: float = None):
+        # Stop claiming new batches and let the threads finish the batch they are sending
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout if timeout is not None else settings.EMAIL_SENDER_SHUTDOWN_TIMEOUT)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                sent = self.send_due_batch()
+            except Exception:
+                logger.exception("Email sender failed to process a batch")
+                sent = 0
+            finally:
+                close_old_connections()
+
+            # Keep going while there is work, otherwise wait to be woken up or for retries to become due
+            if not sent:
+                self._wake_event.wait(settings.EMAIL_OUTBOX_POLL_INTERVAL)
+                self._wake_event.clear()
+
+    def claim_batch(self) -> list[EmailOutbox]:
+        now = timezone.now()
+        claim_id = uuid4()
+
+        # Messages stuck in sending (the process died mid-batch) go back to the queue
+        EmailOutbox.objects.filter(
+            status=SENDING, claimed_at__lt=now - timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+        ).update(status=PENDING, claimed_by=None, claimed_at=None)
+
+        due_ids = list(
+            EmailOutbox.objects.filter(status=PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at').values_list('id', flat=True)[:self.batch_size]
+        )
+        if not due_ids:
+            return []
+
+        # The status check makes the claim safe when several senders pick the same rows
+        EmailOutbox.objects.filter(id__in=due_ids, status=PENDING).update(
+            status=SENDING, claimed_by=claim_id, claimed_at=now
+        )
+        return list(EmailOutbox.objects.filter(claimed_by=claim_id, status=SENDING))
+
+    def send_due_batch(self) -> int:
+        messages = self.claim_batch()
+        if not messages:
+            return 0
+
+        connection = get_connection()
+        try:
+            connection.open()
+            for message in messages:
+                self._send(connection, message)
+        except Exception as e:
+            # The connection itself failed, everything not sent yet is retried later
+            for message in messages:
+                if message.status == SENDING:
+                    self._mark_failed(message, e)
+        finally:
+            connection.close()
+        return len(messages)
+
+    def _send(self, connection, message: EmailOutbox):
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=message.body,
+            from_email=settings.EMAIL_HOST_USER,
+            to=message.recipients,
+            connection=connection,
+        )
+        if message.html_body:
+            email.attach_alternative(message.html_body, "text/html")
+
+        try:
+            email.send()
+        except Exception as e:
+            self._mark_failed(message, e)
+            # Start over with a fresh connection for the rest of the batch
+            connection.close()
+            connection.open()
+            return
+
+        message.status = SENT
+        message.sent_at = timezone.now()
+        message.save(update_fields=['status', 'sent_at', 'updated'])
+
+    @staticmethod
+    def _mark_failed(message: EmailOutbox, error: Exception):
+        message.attempts += 1
+        message.last_error = str(error)
+        message.claimed_by = None
+        message.claimed_at = None
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = FAILED
+        else:
+            message.status = PENDING
+            delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+            message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        message.save(update_fields=['attempts', 'last_error', 'claimed_by', 'claimed_at', 'status',
+                                    'next_attempt_at', 'updated'])
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_email_sender() -> EmailSender:
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = EmailSender()
+    return _sender
+
+
+def html_to_text(html_body: str) -> str:
+    # Our own templates are well-formed, so precompiled patterns are enough and much cheaper than strip_tags
+    text = HIDDEN_BLOCKS.sub('', html_body)
+    text = LINE_BREAK_TAGS.sub('\n', text)
+    text = html.unescape(TAGS.sub('', text))
+    lines = (line.strip() for line in text.splitlines())
+    return BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def render_email(template: str, context: dict) -> tuple[str, str]:
+    # Render once and derive the plain text part from the same output. Compiled templates are kept by
+    # Django's cached template loader, which also picks up edits in development.
+    html_body = get_template(template).render(context)
+    return html_body, html_to_text(html_body)
 
 
 def send_email(subject: str, recipients: list, message: str = None, context: dict = None, template: str = None):
     if context is None:
         context = {}
-    email = EmailMultiAlternatives(
-            subject=subject,
-            body=message or strip_tags(render_to_string(template, context)),
-            from_email=settings.EMAIL_HOST_USER,
-            to=recipients
-    )
 
+    html_body = ''
     if template:
-        email.attach_alternative(render_to_string(template, context), "text/html")
+        html_body, text_body = render_email(template, context)
+        message = message or text_body
 
-    try:
-        EmailThread(email).start()
-    except ConnectionError:
-        raise ConnectionError("Something went wrong\nCouldn't send email")
+    # Written in the caller's transaction, so the mail only goes out if the request succeeds
+    EmailOutbox.objects.create(subject=subject, recipients=recipients, body=message, html_body=html_body)
+    transaction.on_commit(get_email_sender().wake)